@@ -1,7 +1,15 @@
 import os
+import io
+import asyncio
+import re
+import csv
+import html
+import difflib
 import logging
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import sheets
+import quota
+from mirror import get_mirror
+from tenants import get_registry
 from telegram import Update
 from telegram.ext import (
     CommandHandler, 
@@ -13,19 +21,23 @@ from telegram.ext import (
 
 # --- STATE UNTUK CONVERSATION ---
 # Tambahkan REG_USER untuk menampung input username dari Admin
-REG_WITEL, REG_USER, SET_HARI = range(3)
+REG_WITEL, REG_USER, SET_HARI, BULK_FILE, BULK_CONFIRM = range(5)
 
 # --- KONFIGURASI ---
 raw_admin = os.getenv("ADMIN_IDS", "")
 ADMIN_IDS = [int(i.strip()) for i in raw_admin.split(",") if i.strip()]
+# Registrasi massal: batas ukuran file upload & jumlah baris per bagian preview
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(1024 * 1024)))
+BULK_PREVIEW_MAX = int(os.getenv("BULK_PREVIEW_MAX", "40"))
 
 # --- KONEKSI GOOGLE SHEETS ---
 def connect_sheets():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", scope)
-    client = gspread.authorize(creds)
-    spreadsheet_id = os.getenv("SPREADSHEET_ID")
-    return client.open_by_key(spreadsheet_id)
+    # Client & spreadsheet di-cache di sheets.py (tidak authorize ulang tiap panggilan)
+    return sheets.open_spreadsheet(key=os.getenv("SPREADSHEET_ID"))
+
+def get_sheet(nama_tab):
+    # Handle worksheet juga di-cache, jadi tidak ada fetch metadata tiap klik
+    return sheets.get_worksheet(nama_tab, key=os.getenv("SPREADSHEET_ID"))
 
 # ==========================================
 # 1. REGISTRASI / EDIT PIC (ADD & EDIT)
@@ -69,14 +81,18 @@ async def reg_user_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # --- FUNGSI INTERNAL UNTUK UPDATE SPREADSHEET ---
 async def proses_simpan_pic(update, context, username_to_save):
     witel_name = context.user_data.get('selected_witel')
+    # Spreadsheet milik grup/tenant yang sedang dipakai user
+    tenant = get_registry().for_context(update, context)
     
     try:
-        ss = connect_sheets()
-        sh_pic = ss.worksheet("PIC_LIST")
-        cell = sh_pic.find(witel_name, in_column=1)
+        # I/O Sheets dijalankan di thread pool agar bot tetap responsif
+        sh_pic = await sheets.run(tenant.get_sheet, "PIC_LIST")
+        cell = await sheets.run(sh_pic.find, witel_name, in_column=1)
         
         if cell:
-            sh_pic.update_cell(cell.row, 2, username_to_save)
+            await sheets.run(sh_pic.update_cell, cell.row, 2, username_to_save)
+            # Salinan lokal ikut diperbarui supaya /list & status langsung benar
+            await asyncio.to_thread(get_mirror(tenant.mirror_db).set_pic_username, witel_name, username_to_save)
             await update.message.reply_text(
                 f"✅ <b>Berhasil Diperbarui!</b>\n\n"
                 f"Unit: <code>{witel_name}</code>\n"
@@ -91,7 +107,10 @@ async def proses_simpan_pic(update, context, username_to_save):
             
     except Exception as e:
         logging.error(f"Error Update PIC: {e}")
-        await update.message.reply_text("⚠️ Terjadi kesalahan saat mengakses Spreadsheet.")
+        if quota.is_quota_error(e):
+            await update.message.reply_text("⏳ Kuota Google Sheets sedang habis, coba lagi dalam satu menit.")
+        else:
+            await update.message.reply_text("⚠️ Terjadi kesalahan saat mengakses Spreadsheet.")
         
     return ConversationHandler.END
 
@@ -115,15 +134,257 @@ async def set_hari_save(update: Update, context: ContextTypes.DEFAULT_TYPE):
     input_hari = update.message.text.strip()
     try:
         list_hari = [int(h.strip()) for h in input_hari.split(",")]
-        context.bot_data['hari_kerja'] = list_hari
-        await update.message.reply_text(f"✅ Jadwal diperbarui: <code>{list_hari}</code>", parse_mode="HTML")
+        # Hari kerja disimpan per tenant (tiap grup punya jadwal sendiri)
+        tenant = get_registry().for_context(update, context)
+        tenant.hari_kerja = list_hari
+        await update.message.reply_text(
+            f"✅ Jadwal <b>{tenant.key}</b> diperbarui: <code>{list_hari}</code>", parse_mode="HTML"
+        )
     except ValueError:
         await update.message.reply_text("❌ Gunakan format angka. Contoh: 0,1,2")
         return SET_HARI
     return ConversationHandler.END
 
 # ==========================================
-# 3. KENDALI & HANDLER
+# 3. REGISTRASI MASSAL DARI FILE (ADMIN ONLY)
+# ==========================================
+async def bulk_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_chat.type != "private" or update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("🚫 Maaf, perintah ini hanya untuk Admin (lewat DM bot).")
+        return ConversationHandler.END
+
+    await update.message.reply_text(
+        "📥 <b>Registrasi PIC Massal</b>\n\n"
+        "Kirim file <b>CSV</b> atau <b>XLSX</b> berisi kolom <code>Witel</code> dan <code>Username</code>.\n"
+        "Tanpa header pun boleh: kolom 1 = Witel, kolom 2 = Username.\n\n"
+        "Perubahan belum disimpan sebelum Anda konfirmasi. /cancel untuk batal.",
+        parse_mode="HTML"
+    )
+    return BULK_FILE
+
+async def bulk_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    dokumen = update.message.document
+    if dokumen.file_size and dokumen.file_size > BULK_MAX_BYTES:
+        await update.message.reply_text(f"❌ File terlalu besar (maks {BULK_MAX_BYTES // 1024} KB).")
+        return BULK_FILE
+
+    tenant = get_registry().for_context(update, context)
+    try:
+        berkas = await dokumen.get_file()
+        isi = bytes(await berkas.download_as_bytearray())
+        baris_file = baca_file_pic(dokumen.file_name or "", isi)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return BULK_FILE
+    except Exception as e:
+        logging.error(f"Error Baca File PIC: {e}")
+        await update.message.reply_text("⚠️ File tidak bisa dibaca. Pastikan formatnya CSV atau XLSX.")
+        return BULK_FILE
+
+    try:
+        # Satu kali baca PIC_LIST, semua baris file dicocokkan secara lokal
+        sh_pic = await sheets.run(tenant.get_sheet, "PIC_LIST")
+        pic_values = await sheets.run(sh_pic.get_all_values)
+    except Exception as e:
+        logging.error(f"Error Baca PIC_LIST: {e}")
+        if quota.is_quota_error(e):
+            await update.message.reply_text("⏳ Kuota Google Sheets sedang habis, coba lagi dalam satu menit.")
+        else:
+            await update.message.reply_text("⚠️ Terjadi kesalahan saat mengakses Spreadsheet.")
+        return ConversationHandler.END
+
+    rencana = rencanakan_pic(baris_file, pic_values)
+    context.user_data['bulk_plan'] = rencana['ubah']
+    await update.message.reply_text(format_rencana(rencana, tenant.key), parse_mode="HTML")
+    if not rencana['ubah']:
+        context.user_data.pop('bulk_plan', None)
+        return ConversationHandler.END
+    return BULK_CONFIRM
+
+async def bulk_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.message.text.strip().lower() not in ("ya", "y", "yes"):
+        context.user_data.pop('bulk_plan', None)
+        await update.message.reply_text("❌ Registrasi massal dibatalkan, tidak ada yang diubah.")
+        return ConversationHandler.END
+
+    ubah = context.user_data.pop('bulk_plan', [])
+    tenant = get_registry().for_context(update, context)
+    try:
+        sh_pic = await sheets.run(tenant.get_sheet, "PIC_LIST")
+        # Pastikan Witel (A) dan username lama (B) tiap baris masih sama seperti saat preview
+        # (1 batch_get A:B) -> baris tidak bergeser & tidak ada admin lain yang mengubah duluan
+        sel = await sheets.run(sh_pic.batch_get, [f"A{u['row']}:B{u['row']}" for u in ubah])
+        berubah = [u['witel'] for u, nilai in zip(ubah, sel) if _berubah_sejak_preview(u, nilai)]
+        if berubah or len(sel) != len(ubah):
+            await update.message.reply_text(
+                "⚠️ PIC_LIST berubah sejak preview (baris bergeser atau username sudah diubah). "
+                "Tidak ada yang disimpan, silakan kirim ulang file lewat /registerbulk."
+            )
+            return ConversationHandler.END
+
+        # Semua perubahan dalam satu request batch_update
+        await sheets.run(sh_pic.batch_update, [
+            {'range': f"B{u['row']}", 'values': [[u['baru']]]} for u in ubah
+        ])
+        mirror = get_mirror(tenant.mirror_db)
+        await asyncio.to_thread(mirror.set_pic_usernames, [(u['witel'], u['baru']) for u in ubah])
+        await update.message.reply_text(f"✅ <b>{len(ubah)} PIC berhasil diperbarui.</b>", parse_mode="HTML")
+    except Exception as e:
+        logging.error(f"Error Update PIC Massal: {e}")
+        if quota.is_quota_error(e):
+            await update.message.reply_text("⏳ Kuota Google Sheets sedang habis, coba lagi dalam satu menit.")
+        else:
+            await update.message.reply_text("⚠️ Terjadi kesalahan saat mengakses Spreadsheet.")
+    return ConversationHandler.END
+
+async def bulk_bukan_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text("📎 Kirim filenya sebagai dokumen (CSV/XLSX), atau /cancel untuk batal.")
+    return BULK_FILE
+
+# --- HELPER REGISTRASI MASSAL ---
+def baca_file_pic(nama_file, isi):
+    # -> list of (nomor baris file, witel, username)
+    if nama_file.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("File XLSX butuh paket openpyxl di server. Kirim sebagai CSV saja.")
+        wb = load_workbook(io.BytesIO(isi), read_only=True, data_only=True)
+        rows = [["" if c is None else str(c) for c in r] for r in wb.active.iter_rows(values_only=True)]
+    elif nama_file.lower().endswith((".csv", ".txt")):
+        teks = isi.decode("utf-8-sig", errors="replace")
+        try:
+            dialect = csv.Sniffer().sniff(teks[:2048], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.reader(io.StringIO(teks), dialect))
+    else:
+        raise ValueError("Format file harus .csv atau .xlsx")
+
+    rows = [[str(c).strip() for c in r] for r in rows]
+    kol_witel, kol_user, mulai = 0, 1, 0
+    if rows:
+        header = [c.lower() for c in rows[0]]
+        if "witel" in header and "username" in header:
+            kol_witel, kol_user, mulai = header.index("witel"), header.index("username"), 1
+    hasil = []
+    for nomor, r in enumerate(rows[mulai:], mulai + 1):
+        witel = r[kol_witel] if kol_witel < len(r) else ""
+        username = r[kol_user] if kol_user < len(r) else ""
+        if witel or username:
+            hasil.append((nomor, witel, username))
+    return hasil
+
+def rencanakan_pic(baris_file, pic_values):
+    # Cocokkan tiap baris file dengan PIC_LIST (tanpa beda huruf besar/kecil & spasi ganda)
+    pic = {}
+    for row, r in enumerate(pic_values[1:], 2):
+        if r and r[0].strip():
+            pic.setdefault(_kunci(r[0]), (row, r[0].strip(), r[1].strip() if len(r) > 1 else ""))
+
+    rencana = {'ubah': [], 'sama': [], 'tidak_ketemu': [], 'tidak_valid': [], 'ganda': []}
+    dipakai = {}
+    for nomor, witel, username in baris_file:
+        username = _normalisasi_username(username)
+        if not witel or username is None:
+            rencana['tidak_valid'].append((nomor, witel, username))
+            continue
+        cocok = pic.get(_kunci(witel))
+        if cocok is None:
+            # Saran nama terdekat supaya salah ketik mudah diperbaiki
+            saran = difflib.get_close_matches(_kunci(witel), list(pic), n=1, cutoff=0.6)
+            rencana['tidak_ketemu'].append((nomor, witel, pic[saran[0]][1] if saran else None))
+            continue
+        row, nama, lama = cocok
+        if row in dipakai:
+            rencana['ganda'].append((nomor, nama, dipakai[row]))
+            continue
+        dipakai[row] = nomor
+        if lama == username:
+            rencana['sama'].append(nama)
+        else:
+            rencana['ubah'].append({'row': row, 'witel': nama, 'lama': lama, 'baru': username})
+    return rencana
+
+def format_rencana(rencana, tenant_key):
+    baris = [f"📋 <b>Preview Registrasi Massal ({tenant_key})</b>", ""]
+    if rencana['ubah']:
+        baris.append(f"✏️ <b>Akan diubah ({len(rencana['ubah'])}):</b>")
+        baris += _batasi([
+            f"• {html.escape(u['witel'])}: <code>{html.escape(u['lama'] or '-')}</code> → <code>{html.escape(u['baru'])}</code>"
+            for u in rencana['ubah']
+        ])
+    if rencana['sama']:
+        baris.append(f"➖ Tidak berubah: {len(rencana['sama'])} Witel")
+    if rencana['tidak_ketemu']:
+        baris += ["", f"❌ <b>Tidak ditemukan di PIC_LIST ({len(rencana['tidak_ketemu'])}):</b>"]
+        baris += _batasi([
+            f"• baris {n}: {html.escape(w)}" + (f" (maksud Anda <i>{html.escape(saran)}</i>?)" if saran else "")
+            for n, w, saran in rencana['tidak_ketemu']
+        ])
+    if rencana['tidak_valid']:
+        baris += ["", f"⚠️ <b>Baris tidak valid ({len(rencana['tidak_valid'])}):</b>"]
+        baris += _batasi([
+            f"• baris {n}: {html.escape(w)} — username tidak valid" if w else f"• baris {n}: Witel kosong"
+            for n, w, _ in rencana['tidak_valid']
+        ])
+    if rencana['ganda']:
+        baris += ["", f"⚠️ <b>Witel ganda di file, dilewati ({len(rencana['ganda'])}):</b>"]
+        baris += _batasi([f"• baris {n}: {html.escape(w)} (sudah di baris {awal})" for n, w, awal in rencana['ganda']])
+
+    baris.append("")
+    if rencana['ubah']:
+        baris.append("Ketik <b>YA</b> untuk menyimpan semua perubahan sekaligus, atau /cancel untuk batal.")
+    else:
+        baris.append("Tidak ada perubahan yang perlu disimpan.")
+    return "\n".join(baris).replace("\n\n\n", "\n\n")
+
+def _kunci(nama):
+    return " ".join(str(nama).split()).casefold()
+
+def _berubah_sejak_preview(u, nilai):
+    # nilai: hasil batch_get A{row}:B{row} -> [['Witel', '@user']], [['Witel']] atau []
+    r = nilai[0] if nilai else []
+    witel = r[0] if len(r) > 0 else ""
+    lama = r[1].strip() if len(r) > 1 else ""
+    return _kunci(witel) != _kunci(u['witel']) or lama != u['lama']
+
+def _normalisasi_username(username):
+    # "budi_01" / "@budi_01" -> "@budi_01"; None kalau bukan username Telegram yang valid
+    username = username.strip()
+    nama = username[1:] if username.startswith("@") else username
+    if not re.fullmatch(r"[A-Za-z0-9_]{5,32}", nama):
+        return None
+    return f"@{nama}"
+
+def _batasi(items, maks=BULK_PREVIEW_MAX):
+    # Pesan Telegram maksimal 4096 karakter
+    if len(items) <= maks:
+        return items
+    return items[:maks] + [f"• ... dan {len(items) - maks} lainnya"]
+
+# ==========================================
+# 4. SISA KUOTA SHEETS (ADMIN ONLY)
+# ==========================================
+async def cek_kuota(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("🚫 Maaf, perintah ini hanya untuk Admin.")
+        return ConversationHandler.END
+
+    status = quota.governor.status()
+    menunggu = ", ".join(f"{k}: {n}" for k, n in status['waiting'].items()) or "-"
+    await update.message.reply_text(
+        "📊 <b>Kuota Google Sheets (per menit)</b>\n\n"
+        f"Baca: <code>{status['read_remaining']}/{status['read_per_minute']}</code>\n"
+        f"Tulis: <code>{status['write_remaining']}/{status['write_per_minute']}</code>\n"
+        f"Antrean: {menunggu}\n"
+        f"Jeda 429: {status['paused_for']} detik",
+        parse_mode="HTML"
+    )
+    return ConversationHandler.END
+
+# ==========================================
+# 5. KENDALI & HANDLER
 # ==========================================
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("❌ Aksi dibatalkan.")
@@ -133,12 +394,19 @@ def get_admin_handler():
     return ConversationHandler(
         entry_points=[
             CommandHandler("register", reg_start),
-            CommandHandler("sethari", set_hari_start)
+            CommandHandler("sethari", set_hari_start),
+            CommandHandler("kuota", cek_kuota),
+            CommandHandler("registerbulk", bulk_start)
         ],
         states={
             REG_WITEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, reg_witel)],
             REG_USER: [MessageHandler(filters.TEXT & ~filters.COMMAND, reg_user_admin)],
             SET_HARI: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_hari_save)],
+            BULK_FILE: [
+                MessageHandler(filters.Document.ALL, bulk_file),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, bulk_bukan_file),
+            ],
+            BULK_CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, bulk_confirm)],
         },
         fallbacks=[CommandHandler("cancel", cancel)]
     )
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import html
+import array
+import bisect
+import datetime
+import statistics
+import threading
+import logging
+from digest import MAX_MESSAGE_LENGTH
+
+# --- KONFIGURASI ---
+# Rentang default /rekap (hari kerja yang sudah lewat, hari ini belum dihitung)
+REKAP_DEFAULT_HARI = int(os.getenv("REKAP_DEFAULT_HARI", "7"))
+REKAP_MAX_HARI = int(os.getenv("REKAP_MAX_HARI", "366"))
+# Rekap mingguan otomatis dikirim hari ini (0 = Senin), rekap bulanan tiap tanggal 1
+REKAP_MINGGUAN_HARI = int(os.getenv("REKAP_MINGGUAN_HARI", "0"))
+
+logger = logging.getLogger(__name__)
+
+
+# --- AGREGAT PER HARI x PER WITEL ---
+# Disimpan per kolom (satu array per Witel, satu elemen per hari) supaya rekap
+# rentang berapa pun cukup slice + sum di C, tanpa memindai Form Responses lagi.
+# Hanya bisa ditambah di ujung: satu hari baru = satu elemen baru per kolom.
+class Aggregates:
+    def __init__(self):
+        self.dates = []
+        self.wajib = {}   # witel -> bytearray, 1 = hari kerja & Witel terdaftar di PIC_LIST
+        self.isi = {}     # witel -> bytearray, 1 = wajib & sudah submit
+        self.menit = {}   # witel -> array('h'), menit submit pertama sejak 00:00 (-1 = tidak submit)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if self.dates else None
+
+    def _kolom(self, witel):
+        if witel not in self.wajib:
+            # Witel baru: hari-hari sebelumnya tidak dihitung wajib
+            n = len(self.dates)
+            self.wajib[witel] = bytearray(n)
+            self.isi[witel] = bytearray(n)
+            self.menit[witel] = array.array('h', [-1]) * n
+        return witel
+
+    def append_day(self, tanggal, rows):
+        # rows: {witel: (wajib, menit atau None)}
+        if self.dates and tanggal <= self.dates[-1]:
+            raise ValueError(f"Agregat {tanggal} sudah ada (terakhir {self.dates[-1]})")
+        self.dates.append(tanggal)
+        for witel in self.wajib:
+            self.wajib[witel].append(0)
+            self.isi[witel].append(0)
+            self.menit[witel].append(-1)
+        for witel, (wajib, menit) in rows.items():
+            self._kolom(witel)
+            self.wajib[witel][-1] = 1 if wajib else 0
+            self.isi[witel][-1] = 1 if wajib and menit is not None else 0
+            self.menit[witel][-1] = -1 if menit is None else menit
+
+    def rentang(self, awal, akhir):
+        # Tanggal inklusif -> indeks slice
+        return bisect.bisect_left(self.dates, awal), bisect.bisect_right(self.dates, akhir)
+
+    def hari_kerja(self, awal, akhir):
+        i, j = self.rentang(awal, akhir)
+        return sum(1 for k in range(i, j) if any(kol[k] for kol in self.wajib.values()))
+
+    def kepatuhan(self, awal, akhir):
+        # -> {witel: (hari submit, hari wajib)} untuk Witel yang wajib minimal sekali
+        i, j = self.rentang(awal, akhir)
+        hasil = {}
+        for witel, wajib in self.wajib.items():
+            total = sum(wajib[i:j])
+            if total:
+                hasil[witel] = (sum(self.isi[witel][i:j]), total)
+        return hasil
+
+    def streak(self, witel, akhir=None):
+        # Hari kerja berturut-turut sudah submit, dihitung mundur dari `akhir`
+        j = len(self.dates) if akhir is None else bisect.bisect_right(self.dates, akhir)
+        wajib, isi = self.wajib.get(witel, b""), self.isi.get(witel, b"")
+        n = 0
+        for k in range(j - 1, -1, -1):
+            if not wajib[k]:
+                continue
+            if not isi[k]:
+                break
+            n += 1
+        return n
+
+    def median_menit(self, witel, awal, akhir):
+        i, j = self.rentang(awal, akhir)
+        nilai = [m for m in self.menit.get(witel, ())[i:j] if m >= 0]
+        return int(statistics.median(nilai)) if nilai else None
+
+    def sebaran_jam(self, awal, akhir):
+        # Jumlah submission per jam (0-23) di seluruh Witel
+        i, j = self.rentang(awal, akhir)
+        jam = [0] * 24
+        for kolom in self.menit.values():
+            for m in kolom[i:j]:
+                if m >= 0:
+                    jam[m // 60] += 1
+        return jam
+
+
+# --- CACHE PER TENANT ---
+class Analytics:
+    def __init__(self, mirror, tenant):
+        self.mirror = mirror
+        self.tenant = tenant
+        self.agg = Aggregates()
+        # refresh() & rekap() dijalankan di thread (asyncio.to_thread), agregat dibagi bersama
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        # Agregat yang sudah pernah dihitung dibaca sekali dari mirror (tidak dihitung ulang)
+        per_hari = {}
+        for tanggal, witel, wajib, menit in self.mirror.daily_agg():
+            per_hari.setdefault(tanggal, {})[witel] = (wajib, menit)
+        for tanggal in sorted(per_hari):
+            self.agg.append_day(datetime.date.fromisoformat(tanggal), per_hari[tanggal])
+        until = self.mirror.get_meta("analytics_until")
+        self.until = datetime.date.fromisoformat(until) if until else None
+        if per_hari:
+            logger.info(f"Agregat analytics {self.tenant.key} dimuat dari mirror ({len(per_hari)} hari).")
+
+    def closed_until(self, now=None):
+        # Hari terakhir yang datanya sudah final: sudah lewat DAN mirror sudah
+        # sinkron setelah tengah malamnya (bot sempat mati -> tunggu sinkron dulu)
+        synced = self.mirror.synced_at("responses")
+        if synced is None:
+            return None
+        now = now or self.tenant.now()
+        tanggal_sync = datetime.datetime.fromtimestamp(synced, self.tenant.tz).date()
+        return min(now.date(), tanggal_sync) - datetime.timedelta(days=1)
+
+    def refresh(self, now=None):
+        # Tambahkan hari-hari yang baru selesai saja; hari yang sudah ada tidak disentuh.
+        # Backfill + query SQLite bisa lama -> panggil lewat asyncio.to_thread, bukan di event loop
+        with self._lock:
+            return self._refresh(now)
+
+    def rekap(self, awal, akhir, **kwargs):
+        # format_rekap dengan agregat yang tidak sedang ditambah refresh() di thread lain
+        with self._lock:
+            return format_rekap(self.agg, awal, akhir, **kwargs)
+
+    def _refresh(self, now=None):
+        batas = self.closed_until(now)
+        if batas is None:
+            return 0
+        if self.until is not None:
+            mulai = self.until + datetime.timedelta(days=1)
+        else:
+            pertama = self.mirror.first_submission_date()
+            if pertama is None:
+                return 0
+            mulai = datetime.date.fromisoformat(pertama)
+        if mulai > batas:
+            return 0
+
+        roster = {str(p.get('Witel')).strip() for p in self.mirror.pic_list()}
+        hari_kerja = set(self.tenant.hari_kerja)
+        per_hari = {}
+        for tanggal, witel, waktu in self.mirror.submissions_between(mulai.isoformat(), batas.isoformat()):
+            jam = datetime.datetime.fromisoformat(waktu)
+            per_hari.setdefault(tanggal, {})[witel] = jam.hour * 60 + jam.minute
+
+        items = []
+        tanggal = mulai
+        while tanggal <= batas:
+            kerja = tanggal.weekday() in hari_kerja
+            submit = per_hari.get(tanggal.isoformat(), {})
+            rows = {w: (kerja, submit.get(w)) for w in roster}
+            for w, menit in submit.items():
+                rows.setdefault(w, (False, menit))
+            self.agg.append_day(tanggal, rows)
+            items += [(tanggal.isoformat(), w, int(bool(wajib)), menit) for w, (wajib, menit) in rows.items()]
+            tanggal += datetime.timedelta(days=1)
+
+        self.mirror.save_daily_agg(items, until=batas.isoformat())
+        jumlah = (batas - mulai).days + 1
+        self.until = batas
+        logger.info(f"Agregat analytics {self.tenant.key}: +{jumlah} hari (s.d. {batas}).")
+        return jumlah
+
+    def rentang_terakhir(self, hari, now=None):
+        # `hari` hari kalender terakhir yang sudah final
+        akhir = self.until or (now or self.tenant.now()).date() - datetime.timedelta(days=1)
+        return akhir - datetime.timedelta(days=hari - 1), akhir
+
+
+# --- FORMAT LAPORAN ---
+def format_rekap(agg, awal, akhir, judul="📈 <b>REKAP ONE DAY ONE NEWS</b>"):
+    # -> list teks pesan (dipecah kalau lebih dari batas 4096 karakter Telegram)
+    kepatuhan = agg.kepatuhan(awal, akhir)
+    periode = f"{awal.strftime('%d/%m/%Y')} – {akhir.strftime('%d/%m/%Y')}"
+    if not kepatuhan:
+        return [f"{judul}\n{periode}\n\n📭 Belum ada data hari kerja di periode ini."]
+
+    total_isi = sum(isi for isi, _ in kepatuhan.values())
+    total_wajib = sum(wajib for _, wajib in kepatuhan.values())
+    baris = [
+        judul,
+        f"{periode} ({agg.hari_kerja(awal, akhir)} hari kerja)",
+        "",
+        f"Kepatuhan total: <b>{_persen(total_isi, total_wajib)}</b> ({total_isi}/{total_wajib})",
+        "",
+    ]
+    urut = sorted(kepatuhan.items(), key=lambda kv: (-kv[1][0] / kv[1][1], kv[0]))
+    for witel, (isi, wajib) in urut:
+        ikon = "✅" if isi == wajib else "⚠️" if isi else "❌"
+        median = agg.median_menit(witel, awal, akhir)
+        jam = f"{median // 60:02d}:{median % 60:02d}" if median is not None else "-"
+        baris.append(f"{ikon} {html.escape(witel)} — {_persen(isi, wajib)} ({isi}/{wajib}) · "
+                     f"streak {agg.streak(witel, akhir)} · median {jam}")
+
+    sebaran = agg.sebaran_jam(awal, akhir)
+    if any(sebaran):
+        puncak = max(sebaran)
+        baris += ["", "⏰ <b>Sebaran jam submit</b>"]
+        for jam, n in enumerate(sebaran):
+            if n:
+                baris.append(f"<code>{jam:02d}:00</code> {'█' * max(1, round(n / puncak * 10))} {n}")
+    return _pecah(baris[:2], baris[2:])
+
+
+def _pecah(kepala, baris, limit=MAX_MESSAGE_LENGTH):
+    # Dipotong per baris (tag HTML tidak pernah terbelah); judul & periode diulang di tiap bagian
+    budget = limit - len("\n".join(kepala)) - len(" (bagian 99/99)") - 1
+    bagian, isi, size = [], [], 0
+    for b in baris:
+        if isi and size + len(b) + 1 > budget:
+            bagian.append(isi)
+            isi, size = [], 0
+        isi.append(b)
+        size += len(b) + 1
+    bagian.append(isi)
+    if len(bagian) == 1:
+        return ["\n".join(kepala + bagian[0])]
+    return [
+        "\n".join([f"{kepala[0]} (bagian {n}/{len(bagian)})"] + kepala[1:] + isi)
+        for n, isi in enumerate(bagian, 1)
+    ]
+
+
+def _persen(a, b):
+    return f"{a / b * 100:.0f}%" if b else "-"
@@ -0,0 +1,177 @@
+import os
+import gzip
+import json
+import datetime
+import logging
+from gspread.exceptions import WorksheetNotFound
+from responses import parse_timestamp
+
+# --- KONFIGURASI ---
+# Respons lebih tua dari ARCHIVE_RETENTION_DAYS dipindah dari "Form Responses 1" ke
+# file arsip bulanan (gzip, satu baris JSON per respons) di ARCHIVE_DIR/<tenant>/YYYY-MM.jsonl.gz.
+# Ringkasan per hari x per Witel tetap disimpan di mirror & tab ARCHIVE_SUMMARY_SHEET.
+ARCHIVE_RETENTION_DAYS = max(1, int(os.getenv("ARCHIVE_RETENTION_DAYS", "60")))   # minimal 1: hari ini tidak pernah disentuh
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "arsip")
+ARCHIVE_MAX_ROWS = int(os.getenv("ARCHIVE_MAX_ROWS", "5000"))   # per jalan, dibulatkan ke batas hari
+ARCHIVE_SUMMARY_SHEET = os.getenv("ARCHIVE_SUMMARY_SHEET", "Ringkasan Harian")   # kosong = tidak ditulis ke Sheets
+SUMMARY_HEADER = ["Tanggal", "Witel", "Jumlah Respons", "Submit Pertama", "Submit Terakhir"]
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseArchive:
+    def __init__(self, tenant, mirror, ts_col=1, witel_col=5, directory=ARCHIVE_DIR,
+                 retention=ARCHIVE_RETENTION_DAYS, max_rows=ARCHIVE_MAX_ROWS):
+        self.tenant = tenant
+        self.mirror = mirror
+        self.ts_col = ts_col
+        self.witel_col = witel_col
+        self.dir = os.path.join(directory, tenant.key)
+        self.retention = max(1, retention)
+        self.max_rows = max_rows
+
+    def cutoff(self, now=None):
+        # Respons sebelum tanggal ini boleh diarsip
+        return (now or self.tenant.now()).date() - datetime.timedelta(days=self.retention)
+
+    def _waktu(self, row):
+        try:
+            return parse_timestamp(row[self.ts_col], self.tenant.tz)
+        except IndexError:
+            return None
+
+    # --- PILIH & SIMPAN (DIPANGGIL ResponseLog.archive_head DI THREAD POOL) ---
+    def select(self, rows):
+        # Jumlah baris teratas yang lebih tua dari cutoff. Berhenti hanya di batas hari,
+        # supaya ringkasan satu hari tidak terpecah ke dua kali arsip.
+        # Baris tanpa timestamp yang bisa dibaca (kosong / format lain) menghentikan seleksi:
+        # tanggalnya tidak terbukti lebih tua dari cutoff, jadi tidak boleh dihapus dari sheet.
+        batas = self.cutoff()
+        n, sebelumnya = 0, None
+        for row in rows:
+            waktu = self._waktu(row)
+            if waktu is None or waktu.date() >= batas:
+                break
+            tanggal = waktu.date()
+            if tanggal != sebelumnya and n >= self.max_rows:
+                break
+            sebelumnya = tanggal
+            n += 1
+        return n
+
+    def store(self, header, rows):
+        # Dipanggil SEBELUM baris dihapus dari sheet: file arsip + ringkasan harian di mirror.
+        # Kalau hapus gagal lalu diulang, baris ganda di file disaring saat dibaca (lihat read())
+        # dan ringkasan di mirror ditimpa dengan nilai yang sama.
+        per_bulan, bulan = {}, "lainnya"
+        for row in rows:
+            waktu = self._waktu(row)
+            if waktu is not None:
+                bulan = waktu.strftime("%Y-%m")
+            per_bulan.setdefault(bulan, []).append(row)
+        os.makedirs(self.dir, exist_ok=True)
+        for bulan, isi in per_bulan.items():
+            with gzip.open(self._path(bulan), "at", encoding="utf-8") as f:
+                for row in isi:
+                    # Baris mentah disimpan apa adanya (header bisa ganda/kosong/lebih pendek dari baris)
+                    f.write(json.dumps({"header": header, "row": row}, ensure_ascii=False) + "\n")
+        self.mirror.save_daily_summary(self.summarize(rows))
+
+    def _path(self, bulan):
+        return os.path.join(self.dir, f"{bulan}.jsonl.gz")
+
+    # --- RINGKASAN HARIAN ---
+    def summarize(self, rows):
+        # -> list of (tanggal iso, witel, jumlah, pertama iso, terakhir iso)
+        ringkas = {}
+        for row in rows:
+            waktu = self._waktu(row)
+            try:
+                witel = str(row[self.witel_col]).strip()
+            except IndexError:
+                continue
+            if waktu is None or not witel:
+                continue
+            data = ringkas.setdefault((waktu.date().isoformat(), witel), [0, waktu, waktu])
+            data[0] += 1
+            data[1] = min(data[1], waktu)
+            data[2] = max(data[2], waktu)
+        return [(tgl, w, n, a.isoformat(), b.isoformat()) for (tgl, w), (n, a, b) in sorted(ringkas.items())]
+
+    def sync_summary_tab(self):
+        # Ringkasan di mirror yang belum masuk tab -> upsert per (tanggal, witel).
+        # Aman diulang: baris yang sudah ada ditimpa, bukan ditambah lagi.
+        pending = self.mirror.summary_pending()
+        if not pending:
+            return 0
+        if not ARCHIVE_SUMMARY_SHEET:
+            self.mirror.clear_summary_pending(pending)
+            return 0
+        ws = self._summary_sheet()
+        indeks = {
+            (r[0], r[1]): i for i, r in enumerate(ws.get_all_values()[1:], 2) if len(r) >= 2
+        }
+        ubah, baru = [], []
+        for tgl, w, n, a, b in self.mirror.daily_summary_between(pending):
+            isi = [tgl, w, n, a[11:16], b[11:16]]
+            row = indeks.get((tgl, w))
+            if row is None:
+                baru.append(isi)
+            else:
+                ubah.append({'range': f"A{row}:E{row}", 'values': [isi]})
+        if ubah:
+            ws.batch_update(ubah, value_input_option="RAW")
+        if baru:
+            ws.append_rows(baru, value_input_option="RAW")
+        self.mirror.clear_summary_pending(pending)
+        return len(ubah) + len(baru)
+
+    def _summary_sheet(self):
+        spreadsheet = self.tenant.open_spreadsheet()
+        try:
+            return spreadsheet.worksheet(ARCHIVE_SUMMARY_SHEET)
+        except WorksheetNotFound:
+            ws = spreadsheet.add_worksheet(ARCHIVE_SUMMARY_SHEET, rows=1, cols=len(SUMMARY_HEADER))
+            ws.append_row(SUMMARY_HEADER, value_input_option="RAW")
+            return ws
+
+    def summary_on(self, tanggal):
+        # -> list of (witel, jumlah, "HH:MM" pertama, "HH:MM" terakhir)
+        rows = self.mirror.daily_summary_on(tanggal)
+        if rows:
+            return [(w, n, a[11:16], b[11:16]) for w, n, a, b in rows]
+        # Belum ada di mirror -> hitung dari file arsip mentah (kalau ada di instance ini)
+        arsip = self.read(tanggal, tanggal)
+        if arsip:
+            return [(w, n, a[11:16], b[11:16]) for _, w, n, a, b in self.summarize(arsip)]
+        if not ARCHIVE_SUMMARY_SHEET:
+            return []
+        # Mirror instance ini belum punya (arsip dijalankan leader) -> baca tab ringkasan
+        try:
+            values = self._summary_sheet().get_all_values()[1:]
+        except Exception as e:
+            logger.error(f"Gagal membaca {ARCHIVE_SUMMARY_SHEET}: {e}")
+            return []
+        return [(r[1], int(r[2] or 0), r[3], r[4]) for r in values
+                if len(r) >= 5 and r[0] == tanggal.isoformat()]
+
+    # --- BACA ARSIP MENTAH ---
+    def read(self, awal, akhir):
+        # Baris mentah (list, urutan kolom sama dengan sheet) dengan tanggal awal..akhir (inklusif)
+        hasil, terlihat = [], set()
+        bulan = awal.replace(day=1)
+        while bulan <= akhir:
+            path = self._path(bulan.strftime("%Y-%m"))
+            if os.path.exists(path):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for baris in f:
+                        if baris in terlihat:
+                            continue
+                        terlihat.add(baris)
+                        data = json.loads(baris)
+                        row = data["row"] if "row" in data else list(data.values())
+                        waktu = self._waktu(row)
+                        if waktu is not None and awal <= waktu.date() <= akhir:
+                            hasil.append(row)
+            bulan = (bulan + datetime.timedelta(days=32)).replace(day=1)
+        return hasil
@@ -0,0 +1,274 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+import subprocess
+import contextlib
+from collections import Counter
+
+# Benchmark jalur data bot dengan sheet & Telegram palsu (fakes.py), tanpa Google/Telegram asli.
+# Hasil disimpan per commit supaya regresi bisa dibandingkan:
+#
+#   python benchmark.py --sizes 100,1000,10000,100000
+#   python benchmark.py --compare bench_results/abc1234.json
+#
+# Yang diukur per operasi: waktu (ms), jumlah panggilan remote per method, dan memori puncak
+# (tracemalloc aktif sepanjang pengukuran, jadi waktu ikut termasuk overhead-nya).
+#
+# Modul yang diukur: bot_update.py (status, sync, /list) dan bot.py (reminder, tombol).
+# bot.py butuh handlers/admin.py; kalau tidak ada di checkout ini, reminder & tombol diukur
+# dari test_bot.py (kembarannya dengan kirim_reminder_grup/tombol_handler yang sama, plus pesan
+# "semua selesai" saat tidak ada tugas). Modul yang dipakai dicatat di hasil (params.modul_tugas).
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(REPO_DIR, "bench_results")
+GROUP_CHAT_ID = "-1001000000001"
+PENDING_RATIO = 0.05
+
+
+def siapkan_env(tmpdir, digest_mode):
+    # Harus sebelum import modul bot: konfigurasi dibaca saat import
+    os.environ.update({
+        "GROUP_CHAT_ID": GROUP_CHAT_ID,
+        "SPREADSHEET_ID": "bench",
+        "SPREADSHEET_NAME": "bench",
+        "TELEGRAM_TOKEN": "0:bench",
+        "TENANTS_FILE": os.path.join(tmpdir, "tenants-tidak-ada.json"),
+        "MIRROR_DB": os.path.join(tmpdir, "mirror.db"),
+        "SHARED_STATE_DB": os.path.join(tmpdir, "shared_state.db"),
+        "REMINDER_LEDGER_FILE": os.path.join(tmpdir, "reminder_ledger.json"),
+        "STATUS_BOARD_FILE": os.path.join(tmpdir, "status_board.json"),
+        "REMINDER_MODE": "digest" if digest_mode else "single",
+        # Rate limit dispatcher dibuka lebar: yang diukur kerja bot, bukan antrean flood control
+        "SEND_GLOBAL_RATE": "1000000",
+        "SEND_CHAT_RATE": "1000000",
+        "SEND_GROUP_RATE": "1000000",
+        "SEND_GROUP_BURST": "1000000",
+    })
+
+
+# --- DATA SINTETIS ---
+def sheet_tugas(n):
+    rows = [["id", "penulis", "kategori", "judul", "deadline", "status"]]
+    for i in range(1, n + 1):
+        status = "pending" if random.random() < PENDING_RATIO else "done"
+        rows.append([str(i), f"penulis{i % 50}", "berita", f"Judul artikel nomor {i}", "17:00", status])
+    return rows
+
+
+def sheet_pic(n):
+    rows = [["Witel", "Username"]]
+    rows += [[f"Witel {i}", f"@pic{i}"] for i in range(1, n + 1)]
+    return rows
+
+
+def sheet_responses(n, jumlah_witel, hari_ini):
+    rows = [["No", "Timestamp", "Email", "Nama", "Judul", "Witel", "Link"]]
+    for i in range(1, n + 1):
+        # Sebagian besar jawaban hari-hari sebelumnya, sebagian hari ini
+        tanggal = hari_ini - datetime.timedelta(days=random.randint(0, 60))
+        waktu = datetime.datetime.combine(tanggal, datetime.time(random.randint(7, 17), random.randint(0, 59)))
+        rows.append([str(i), waktu.strftime("%d/%m/%Y %H:%M:%S"), f"u{i}@contoh.id", f"PIC {i}",
+                     f"Berita {i}", f"Witel {random.randint(1, jumlah_witel)}", f"https://contoh.id/{i}"])
+    return rows
+
+
+# --- PENGUKURAN ---
+class Pengukur:
+    def __init__(self, calls):
+        self.calls = calls
+        self.hasil = []
+
+    async def ukur(self, nama, rows, coro_fn):
+        sebelum = Counter(self.calls)
+        tracemalloc.start()
+        mulai = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await coro_fn()
+        wall = time.perf_counter() - mulai
+        _, puncak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        remote = {k: v for k, v in (Counter(self.calls) - sebelum).items()}
+        self.hasil.append({
+            "op": nama, "rows": rows, "wall_ms": round(wall * 1000, 2),
+            "remote_calls": sum(remote.values()), "calls": remote, "peak_kb": round(puncak / 1024, 1),
+        })
+        print(f"{nama:<22} {rows:>7} baris  {wall * 1000:>10.1f} ms  "
+              f"{sum(remote.values()):>6} panggilan  {puncak / 1024:>10.1f} KB")
+
+
+async def bench_tugas(tb, n, args, pengukur, tmpdir):
+    from tasks import TaskCache, StatusWriter
+    from ledger import ReminderLedger
+    from dispatcher import Dispatcher
+    from mirror import Mirror
+    from change_detect import ChangeDetector, FakeMetadataSource
+    from fakes import FakeWorksheet, FakeBot, fake_update, fake_context, FakeMessage
+
+    ws = FakeWorksheet("tugas", sheet_tugas(n), latency=args.sheets_latency, calls=pengukur.calls)
+    bot = FakeBot(latency=args.bot_latency, calls=pengukur.calls)
+    meta = FakeMetadataSource()
+
+    tb.task_cache = TaskCache(lambda: ws, mirror=Mirror(os.path.join(tmpdir, f"tugas-{n}.db")),
+                              changes=ChangeDetector(meta, ttl=0))
+    tb.status_writer = StatusWriter(tb.task_cache)
+    tb.reminder_ledger = ReminderLedger(path=os.path.join(tmpdir, f"ledger-{n}.json"))
+    tb.dispatcher = Dispatcher()
+    context = fake_context(bot)
+
+    await pengukur.ukur("reminder_cold", n, lambda: tb.kirim_reminder_grup(context))
+    await pengukur.ukur("reminder_warm", n, lambda: tb.kirim_reminder_grup(context))
+
+    pending = [r for r in ws.rows[1:] if r[5] == "pending"] or [ws.rows[-1]]
+    target = random.choice(pending)
+    pesan = FakeMessage(bot, GROUP_CHAT_ID, "reminder", message_id=1)
+    update = fake_update(bot, GROUP_CHAT_ID, callback_data=f"done_{target[0]}_{target[3][:30]}", message=pesan)
+
+    async def klik():
+        await tb.tombol_handler(update, context)
+        await tb.status_writer.flush()
+    await pengukur.ukur("tombol_done", n, klik)
+
+
+async def bench_status(bu, n, args, pengukur, tmpdir):
+    from change_detect import ChangeDetector, FakeMetadataSource
+    from fakes import FakeWorksheet, FakeSpreadsheet, FakeBot, fake_update, fake_context
+
+    jumlah_witel = max(10, n // 10)
+    tenant = bu.registry.default
+    hari_ini = tenant.now().date()
+    form = FakeWorksheet("Form Responses 1", sheet_responses(n, jumlah_witel, hari_ini),
+                         latency=args.sheets_latency, calls=pengukur.calls)
+    pic = FakeWorksheet("PIC_LIST", sheet_pic(jumlah_witel), latency=args.sheets_latency, calls=pengukur.calls)
+    spreadsheet = FakeSpreadsheet([pic, form])
+    bot = FakeBot(latency=args.bot_latency, calls=pengukur.calls)
+    meta = FakeMetadataSource()
+
+    # Data tenant baru per ukuran (mirror kosong -> start dingin)
+    tenant.get_sheet = spreadsheet.worksheet
+    tenant.mirror_db = os.path.join(tmpdir, f"status-{n}.db")
+    td = bu.TenantData(tenant)
+    td.changes = ChangeDetector(meta, ttl=0)
+    bu.data_tenant[tenant.key] = td
+    context = fake_context(bot, job_data=tenant.key)
+
+    await pengukur.ukur("status_cold", n, lambda: bu.dapatkan_status_harian(td))
+    await pengukur.ukur("status_warm", n, lambda: bu.dapatkan_status_harian(td))
+
+    async def jawaban_baru():
+        form.rows.append([str(n + 1), tenant.now().strftime("%d/%m/%Y %H:%M:%S"), "baru@contoh.id",
+                          "PIC Baru", "Berita baru", "Witel 1", "https://contoh.id/baru"])
+        meta.bump()
+        await bu.sync_mirror(td)
+        await bu.dapatkan_status_harian(td)
+    await pengukur.ukur("status_new_response", n, jawaban_baru)
+
+    await pengukur.ukur("sync_unchanged", n, lambda: bu.sync_mirror(td))
+    update = fake_update(bot, tenant.chat_id)
+    await pengukur.ukur("cmd_list", n, lambda: bu.cmd_list(update, context))
+
+
+def commit_sekarang():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "lokal"
+
+
+def bandingkan(lama, baru):
+    indeks = {(h["op"], h["rows"]): h for h in lama["results"]}
+    print(f"\nPerbandingan dengan {lama['commit']} -> {baru['commit']}:")
+    for h in baru["results"]:
+        dulu = indeks.get((h["op"], h["rows"]))
+        if dulu is None:
+            continue
+        delta = (h["wall_ms"] - dulu["wall_ms"]) / dulu["wall_ms"] * 100 if dulu["wall_ms"] else 0.0
+        tanda = "⚠️ " if delta > 20 or h["remote_calls"] > dulu["remote_calls"] else "  "
+        print(f"{tanda}{h['op']:<22} {h['rows']:>7}  {dulu['wall_ms']:>10.1f} -> {h['wall_ms']:>10.1f} ms "
+              f"({delta:+.0f}%)  panggilan {dulu['remote_calls']} -> {h['remote_calls']}  "
+              f"memori {dulu['peak_kb']:.0f} -> {h['peak_kb']:.0f} KB")
+
+
+def modul_tugas(nama):
+    # -> (modul, nama) untuk jalur reminder & tombol; utamakan entry point produksi
+    import importlib
+    if nama == "auto":
+        try:
+            return importlib.import_module("bot"), "bot"
+        except ImportError as e:
+            print(f"⚠️  bot.py tidak bisa diimport ({e}), reminder & tombol diukur dari test_bot.py")
+            nama = "test_bot"
+    return importlib.import_module(nama), nama
+
+
+async def jalankan(args, tmpdir):
+    sys.path.insert(0, REPO_DIR)
+    import logging
+    tb, args.modul_tugas = modul_tugas(args.modul)
+    import bot_update as bu
+    import sheets
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pengukur = Pengukur(Counter())
+    try:
+        for n in args.sizes:
+            random.seed(n)
+            await bench_tugas(tb, n, args, pengukur, tmpdir)
+            await bench_status(bu, n, args, pengukur, tmpdir)
+    finally:
+        sheets.shutdown(wait=False)
+    return pengukur.hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur data bot dengan sheet & Telegram palsu")
+    parser.add_argument("--sizes", default="100,1000,10000,100000",
+                        type=lambda s: [int(x) for x in s.split(",") if x.strip()])
+    parser.add_argument("--sheets-latency", type=float, default=0.0, help="detik per panggilan Sheets palsu")
+    parser.add_argument("--bot-latency", type=float, default=0.0, help="detik per panggilan Telegram palsu")
+    parser.add_argument("--digest", action="store_true", help="reminder mode digest")
+    parser.add_argument("--modul", default="auto", choices=["auto", "bot", "test_bot"],
+                        help="modul reminder & tombol (auto = bot.py, test_bot.py kalau bot.py tidak bisa diimport)")
+    parser.add_argument("--output", help=f"file hasil (default {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--compare", help="file hasil lama untuk dibandingkan")
+    args = parser.parse_args()
+
+    commit = commit_sekarang()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        siapkan_env(tmpdir, args.digest)
+        # Log file bot (bot.log) ikut masuk folder sementara
+        cwd = os.getcwd()
+        os.chdir(tmpdir)
+        try:
+            hasil = asyncio.run(jalankan(args, tmpdir))
+        finally:
+            os.chdir(cwd)
+
+    laporan = {
+        "commit": commit,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": {"sheets_latency": args.sheets_latency, "bot_latency": args.bot_latency,
+                   "digest": args.digest, "pending_ratio": PENDING_RATIO,
+                   "modul_tugas": args.modul_tugas, "modul_status": "bot_update"},
+        "results": hasil,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(laporan, f, indent=2)
+    print(f"\nHasil disimpan di {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            bandingkan(json.load(f), laporan)
+
+
+if __name__ == "__main__":
+    main()
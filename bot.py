@@ -1,83 +1,113 @@
 import os
 import logging
 import datetime
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler
+
+# .env dimuat sebelum import modul lokal (konfigurasinya dibaca saat import)
+load_dotenv()
+
 from handlers.admin import get_admin_handler
+import sheets
+import quota
+from tasks import TaskCache, StatusWriter
+from dispatcher import Dispatcher
+import digest
+from ledger import ReminderLedger, kirim_dengan_ledger
+import webhook
+import metrics
+import events
+from mirror import get_mirror, MIRROR_SYNC_INTERVAL
+from change_detect import ChangeDetector, DriveMetadataSource
 
 # --- 1. KONFIGURASI & LOGGING ---
-load_dotenv()
 TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROUP_CHAT_ID = os.getenv("GROUP_CHAT_ID")
 SHEET_NAME = os.getenv("SPREADSHEET_NAME")
 
-# Logging (Simpan error ke file bot.log)
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
+# Logging (Simpan error ke file bot.log). Ditulis thread terpisah lewat antrean,
+# event terstruktur per klik/job/panggilan API ada di events.jsonl (lihat events.py)
+events.setup_logging("bot.log")
 logger = logging.getLogger(__name__)
 
 # --- 2. FUNGSI KONEKSI GOOGLE SHEETS ---
 def connect_sheets():
-    # Pastikan file json service account ada di folder yang sama
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", scope)
-    client = gspread.authorize(creds)
-    return client.open(SHEET_NAME).sheet1
+    # Client & worksheet di-cache di sheets.py (tidak authorize ulang tiap panggilan)
+    return sheets.get_worksheet(title=SHEET_NAME)
+
+# Cache baris tugas: reminder & /status berbagi satu pembacaan per TTL.
+# Tiap refresh cek versi file di Drive dulu; tab dibaca penuh hanya kalau berubah.
+sheet_changes = ChangeDetector(DriveMetadataSource(lambda: connect_sheets().spreadsheet))
+task_cache = TaskCache(connect_sheets, mirror=get_mirror(), changes=sheet_changes)
+# Klik "Sudah Submit" ditampung lalu ditulis per batch (write-behind)
+status_writer = StatusWriter(task_cache)
+# Semua pesan keluar lewat dispatcher (rate limit + RetryAfter otomatis)
+dispatcher = Dispatcher()
+# Catatan reminder per tugas -> tugas yang sama tidak dikirim ulang tiap tick
+reminder_ledger = ReminderLedger()
+
+async def job_sync_mirror(context: ContextTypes.DEFAULT_TYPE):
+    # Mirror lokal tab tugas diperbarui di background, bukan saat user menunggu
+    try:
+        await task_cache.refresh()
+    except Exception as e:
+        logger.error(f"Sinkronisasi mirror gagal: {e}")
+
+async def tugas_pending():
+    # Pastikan status dibaca sebagai string lowercase
+    records = await task_cache.get_records()
+    return [row for row in records if str(row['status']).lower() == 'pending']
+
+# --- 3a. PESAN REMINDER PER TUGAS ---
+def buat_pesan_reminder(row):
+    # Ambil data
+    task_id = row['id']
+    penulis = row['penulis'] 
+    judul = row['judul']
+    deadline = row['deadline']
+
+    # --- PERBAIKAN DI SINI (Gunakan Format HTML) ---
+    # HTML lebih aman untuk username yang ada garis bawah (_)
+    pesan = (
+        f"📢 <b>REMINDER ARTIKEL</b>\n"
+        f"Halo {penulis}, mohon segera submit ya!\n\n"
+        f"📝 <b>Judul:</b> {judul}\n"
+        f"📅 <b>Deadline:</b> {deadline}\n\n"
+        f"👇 <i>Klik tombol di bawah jika sudah upload:</i>"
+    )
+
+    # Tombol Interaktif
+    keyboard = [[InlineKeyboardButton("✅ Sudah Submit", callback_data=f"done_{task_id}")]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Argumen kirim ke Grup dengan parse_mode HTML
+    return dict(
+        chat_id=GROUP_CHAT_ID,
+        text=pesan,
+        reply_markup=reply_markup,
+        parse_mode="HTML" # <--- PENTING: GANTI JADI HTML
+    )
 
 # --- 3. FITUR UTAMA: KIRIM REMINDER KE GRUP (VERSI HTML) ---
 async def kirim_reminder_grup(context: ContextTypes.DEFAULT_TYPE):
     logger.info("Memulai pengecekan tugas...") # Hapus emoji jam pasir
     
     try:
-        sh = connect_sheets()
-        records = sh.get_all_records()
-        
-        count_sent = 0
+        pending = await tugas_pending()
 
-        for row in records:
-            # Pastikan status dibaca sebagai string lowercase
-            if str(row['status']).lower() == 'pending':
-                
-                # Ambil data
-                task_id = row['id']
-                penulis = row['penulis'] 
-                judul = row['judul']
-                deadline = row['deadline']
-
-                # --- PERBAIKAN DI SINI (Gunakan Format HTML) ---
-                # HTML lebih aman untuk username yang ada garis bawah (_)
-                pesan = (
-                    f"📢 <b>REMINDER ARTIKEL</b>\n"
-                    f"Halo {penulis}, mohon segera submit ya!\n\n"
-                    f"📝 <b>Judul:</b> {judul}\n"
-                    f"📅 <b>Deadline:</b> {deadline}\n\n"
-                    f"👇 <i>Klik tombol di bawah jika sudah upload:</i>"
-                )
-
-                # Tombol Interaktif
-                keyboard = [[InlineKeyboardButton("✅ Sudah Submit", callback_data=f"done_{task_id}")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                # Kirim ke Grup dengan parse_mode HTML
-                await context.bot.send_message(
-                    chat_id=GROUP_CHAT_ID,
-                    text=pesan,
-                    reply_markup=reply_markup,
-                    parse_mode="HTML" # <--- PENTING: GANTI JADI HTML
-                )
-                count_sent += 1
+        if digest.is_enabled():
+            # Mode digest: semua tugas dikemas dalam sesedikit mungkin pesan
+            antrean = [(f"digest_{i}", m) for i, m in enumerate(digest.build_messages(GROUP_CHAT_ID, pending), 1)]
+        else:
+            antrean = [(row['id'], buat_pesan_reminder(row)) for row in pending]
         
-        if count_sent > 0:
-            logger.info(f"Selesai. Mengirim {count_sent} reminder.")
+        # Hanya tugas baru/berubah/lewat cool-down yang dikirim atau diedit
+        terkirim, diedit, dilewati, gagal = await kirim_dengan_ledger(context.bot, dispatcher, reminder_ledger, antrean)
+        if gagal:
+            logger.warning(f"{gagal} reminder gagal terkirim, dicoba lagi di jalan berikutnya.")
+        if antrean:
+            logger.info(f"Selesai. Reminder terkirim={terkirim}, gagal={gagal}, diedit={diedit}, dilewati={dilewati}.")
         else:
             logger.info("Tidak ada tugas pending.")
 
@@ -101,25 +131,28 @@ async def tombol_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # Ambil ID dari data tombol
             task_id_target = data.split("_")[1] 
             
-            print(f"👉 Tombol diklik! Mencari ID: {task_id_target}...") # Debug Terminal
+            events.emit("tombol.klik", task_id=task_id_target, user=user_klik)
 
-            sh = connect_sheets()
-            
-            # 2. CARA LEBIH AMAN: Cari ID khusus di Kolom 1 (Kolom A) saja
-            # Supaya tidak salah ambil angka yang mirip di kolom lain
-            cell = sh.find(task_id_target, in_column=1)
+            # 2. Cek ID di cache tab tugas (Kolom A = id)
+            task = await task_cache.find(task_id_target)
             
             # Jika ID tidak ketemu
-            if cell is None:
-                print(f"❌ Gagal: ID {task_id_target} tidak ditemukan di Kolom A.")
+            if task is None:
+                events.emit("tombol.tidak_ditemukan", task_id=task_id_target)
                 await query.message.reply_text(f"⚠️ Gagal: ID {task_id_target} tidak ditemukan di Spreadsheet. Cek datanya.")
                 return
 
             # 3. Update Kolom Status (Kolom F = Indeks 6)
-            # Pastikan urutan kolom di Excel: A=1, B=2, C=3, D=4, E=5, F=6 (Status)
-            sh.update_cell(cell.row, 6, "done")
+            # Tidak ditulis langsung: masuk antrean dan dikirim per batch oleh status_writer
+            await status_writer.enqueue(task_id_target, "done")
             
-            print(f"✅ Sukses! Baris {cell.row} kolom 6 diubah jadi 'done'.")
+            events.emit("tombol.antre", task_id=task_id_target, status="done")
+
+            # Tombol dari pesan digest: teks ringkasan dibiarkan, keyboard disegarkan
+            if digest.is_digest(query.message):
+                await digest.refresh_keyboard(query, await tugas_pending(), digest.current_page(query.message))
+                await query.message.reply_text(f"✅ Tugas ID {task_id_target} dikonfirmasi oleh @{user_klik}.")
+                return
             
             # 4. Ubah Pesan di Telegram
             pesan_baru = (
@@ -136,15 +169,22 @@ async def tombol_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.message.reply_text(f"✅ Tugas ID {task_id_target} statusnya sudah diupdate jadi DONE!")
 
         except Exception as e:
-            # Tampilkan error lengkap di Terminal
-            print(f"❌ ERROR SISTEM: {e}")
-            await query.message.reply_text("⚠️ Terjadi kesalahan sistem saat update database.")
+            # Error lengkap ke bot.log, ringkasnya ke events.jsonl
+            logger.error(f"Gagal memproses tombol {data}: {e}")
+            events.emit("tombol.error", data=data, error=type(e).__name__)
+            if quota.is_quota_error(e):
+                await query.message.reply_text("⏳ Google Sheets sedang sibuk, coba klik lagi sebentar lagi.")
+            else:
+                await query.message.reply_text("⚠️ Terjadi kesalahan sistem saat update database.")
+
+    # Navigasi halaman keyboard digest
+    elif data.startswith("digest_"):
+        await digest.refresh_keyboard(query, await tugas_pending(), digest.parse_page(data))
 
 # --- 5. FITUR TAMBAHAN: CEK STATUS (/status) ---
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        sh = connect_sheets()
-        records = sh.get_all_records()
+        records = await task_cache.get_records()
         list_pending = []
 
         for row in records:
@@ -162,10 +202,19 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Gagal mengambil data.")
         logger.error(e)
 
+# --- HOOK START/STOP APLIKASI ---
+async def post_init(application):
+    await status_writer.start()
+
+async def post_shutdown(application):
+    # Pastikan update status yang masih antre terkirim sebelum bot mati
+    await status_writer.stop()
+    await sheets.on_shutdown(application)
+
 # --- MAIN PROGRAM ---
 if __name__ == '__main__':
     # Build Aplikasi
-    app = ApplicationBuilder().token(TOKEN).build()
+    app = ApplicationBuilder().token(TOKEN).request(metrics.telegram_request()).post_init(post_init).post_shutdown(post_shutdown).build()
 
     # Daftarkan Handler
     app.add_handler(get_admin_handler())
@@ -174,6 +223,7 @@ if __name__ == '__main__':
 
     # Setup JobQueue (Penjadwal)
     job_queue = app.job_queue
+    job_queue.run_repeating(job_sync_mirror, interval=MIRROR_SYNC_INTERVAL, first=1)
     
     print("Bot Berjalan... Tekan Ctrl+C untuk berhenti.")
 
@@ -185,4 +235,5 @@ if __name__ == '__main__':
     # time_wib = datetime.time(hour=2, minute=0) # 02:00 UTC = 09:00 WIB
     # job_queue.run_daily(kirim_reminder_grup, time=time_wib, days=(0, 1, 2, 3, 4)) 
 
-    app.run_polling()
\ No newline at end of file
+    # Polling atau webhook, dipilih lewat BOT_MODE di .env
+    webhook.run(app)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import os
-import pytz
+import asyncio
 import datetime
 import logging
 import traceback
@@ -11,26 +11,68 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # 2. BARU IMPORT DARI FILE LAIN
-from admin import get_admin_handler, connect_sheets
+from admin import get_admin_handler
+import sheets
+from responses import ResponseLog, SubmissionIndex
+from dispatcher import Dispatcher
+from status_board import StatusBoard, STATUS_BOARD_INTERVAL
+import webhook
+import metrics
+import events
+from mirror import get_mirror, MIRROR_SYNC_INTERVAL
+from change_detect import ChangeDetector, DriveMetadataSource
+from daily_status import DailyStatus, StatusSnapshot
+from tenants import get_registry, TENANT_STAGGER
+from cluster import get_shared_state, LeaderElection, LEADER_LEASE
+from archive import ResponseArchive
+from analytics import Analytics, REKAP_DEFAULT_HARI, REKAP_MAX_HARI, REKAP_MINGGUAN_HARI
 
 # --- KONFIGURASI ---
-try:
-    GROUP_CHAT_ID = int(os.getenv("GROUP_CHAT_ID"))
-except (ValueError, TypeError):
-    print("❌ ERROR: GROUP_CHAT_ID di .env tidak ditemukan atau bukan angka!")
-    GROUP_CHAT_ID = 0
-
-TIMEZONE = pytz.timezone('Asia/Makassar')
-logging.basicConfig(level=logging.INFO)
+events.setup_logging(format=logging.BASIC_FORMAT)
 logger = logging.getLogger(__name__)
 
+# Satu proses melayani semua grup di registry tenant (tenants.json / .env)
+registry = get_registry()
+# Semua pesan keluar lewat dispatcher (rate limit + RetryAfter otomatis)
+dispatcher = Dispatcher()
+# Satu pesan status ter-pin per hari per grup, diedit saat ada submission baru
+status_board = StatusBoard(dispatcher, state=get_shared_state())
+# Beberapa instance boleh jalan bersamaan; job terjadwal hanya dijalankan leader
+election = LeaderElection(get_shared_state())
+
+# --- DATA PER TENANT ---
+class TenantData:
+    def __init__(self, tenant):
+        self.tenant = tenant
+        # Mirror SQLite lokal: semua baca dilayani dari sini, Sheets disinkron di background
+        self.mirror = get_mirror(tenant.mirror_db)
+        # Jawaban form dibaca inkremental (hanya baris baru setiap sinkronisasi)
+        self.response_log = ResponseLog(lambda: tenant.get_sheet("Form Responses 1"), mirror=self.mirror)
+        self.submission_index = SubmissionIndex(tenant.tz, mirror=self.mirror)
+        # Versi file di Drive dicek dulu; PIC_LIST & Form Responses dibaca hanya kalau berubah
+        self.changes = ChangeDetector(DriveMetadataSource(tenant.open_spreadsheet))
+        # Satu snapshot status harian dipakai bersama /cek, tombol, rekap & papan status
+        self.status_harian = DailyStatus(lambda now: hitung_status_harian(self, now), tenant.tz)
+        # Agregat harian per Witel untuk /rekap; hari yang sudah lewat tidak dihitung ulang
+        self.analytics = Analytics(self.mirror, tenant)
+        # Respons lama dipindah ke arsip bulanan + ringkasan harian (job_arsip, /arsip)
+        self.archive = ResponseArchive(tenant, self.mirror, ts_col=self.submission_index.ts_col,
+                                       witel_col=self.submission_index.witel_col)
+
+data_tenant = {t.key: TenantData(t) for t in registry}
+
+def data_untuk(update, context):
+    return data_tenant[registry.for_context(update, context).key]
+
+def data_job(context):
+    # Job terjadwal membawa key tenant di job.data
+    return data_tenant[context.job.data]
+
 # --- FUNGSI LIST WITEL (Fitur Baru) ---
 async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     try:
-        ss = connect_sheets()
-        sheet_pic = ss.worksheet("PIC_LIST")
-        master_pic = sheet_pic.get_all_records()
+        master_pic = await baca_pic_lokal(data_untuk(update, context))
         
         if not master_pic:
             pesan = "📭 Daftar PIC masih kosong di Spreadsheet."
@@ -56,16 +98,27 @@ async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_cek(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user = update.effective_user
-    user_handle = f"@{user.username}" if user.username else user.first_name
 
     try:
-        sudah, belum, tgl = await dapatkan_status_harian()
-        is_belum = any(user_handle in b for b in belum)
+        snapshot = await data_untuk(update, context).status_harian.get()
+        # Lookup dict username -> Witel; teks baru disusun setelah ketemu
+        # Nama depan hanya dipakai kalau akun tidak punya username (nama depan bisa kembar)
+        status_saya = snapshot.status_for(user.username if user.username else user.first_name)
+        tgl = snapshot.label_tanggal
         
-        if is_belum:
-            pesan = f"⚠️ <b>Status {tgl}:</b>\nAnda belum submit berita hari ini. Segera lapor ya!"
+        if not status_saya:
+            pesan = (f"ℹ️ <b>Status {tgl}:</b>\nAnda belum terdaftar sebagai PIC Witel mana pun.\n"
+                     "Ketik /register di DM bot untuk mendaftar.")
         else:
-            pesan = f"✅ <b>Status {tgl}:</b>\nTerima kasih! Laporan Anda sudah tercatat di sistem."
+            baris = [
+                f"✅ {w} — tercatat {waktu.strftime('%H:%M')}" if waktu else f"❌ {w} — belum submit"
+                for w, waktu in status_saya
+            ]
+            if all(waktu for _, waktu in status_saya):
+                pembuka = f"✅ <b>Status {tgl}:</b>\nTerima kasih! Laporan Anda sudah tercatat di sistem."
+            else:
+                pembuka = f"⚠️ <b>Status {tgl}:</b>\nAnda belum submit berita hari ini. Segera lapor ya!"
+            pesan = pembuka + "\n\n" + "\n".join(baris)
             
         if query:
             await query.message.reply_text(pesan, parse_mode="HTML")
@@ -76,12 +129,64 @@ async def cmd_cek(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Error pada cmd_cek: {e}")
         await update.effective_message.reply_text("⚠️ Gagal mengambil data.")
 
+# --- REKAP KEPATUHAN ---
+async def cmd_rekap(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # /rekap -> 7 hari terakhir, /rekap 30 atau /rekap bulan -> 30 hari terakhir
+    td = data_untuk(update, context)
+    arg = context.args[0].lower() if context.args else ""
+    hari = {"minggu": 7, "bulan": 30}.get(arg) or (int(arg) if arg.isdigit() else REKAP_DEFAULT_HARI)
+    hari = max(1, min(hari, REKAP_MAX_HARI))
+
+    try:
+        await asyncio.to_thread(td.analytics.refresh)
+        awal, akhir = td.analytics.rentang_terakhir(hari)
+        for pesan in await asyncio.to_thread(td.analytics.rekap, awal, akhir):
+            await update.effective_message.reply_text(pesan, parse_mode="HTML")
+    except Exception as e:
+        logger.error(f"Error pada cmd_rekap: {e}")
+        await update.effective_message.reply_text("⚠️ Gagal menyusun rekap.")
+
+# --- ARSIP RESPONS ---
+async def cmd_arsip(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # /arsip 15/08/2026 -> ringkasan per Witel hari itu (respons yang sudah dipindah dari Form Responses)
+    td = data_untuk(update, context)
+    tanggal = None
+    for fmt in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            tanggal = datetime.datetime.strptime(context.args[0], fmt).date() if context.args else None
+            break
+        except ValueError:
+            continue
+    if tanggal is None:
+        await update.effective_message.reply_text("Format: /arsip DD/MM/YYYY")
+        return
+
+    try:
+        ringkasan = await sheets.run(td.archive.summary_on, tanggal)
+        tgl = tanggal.strftime('%d/%m/%Y')
+        if not ringkasan:
+            pesan = f"📭 Tidak ada ringkasan arsip untuk {tgl}."
+            if tanggal >= td.archive.cutoff():
+                pesan += "\nData tanggal itu belum diarsip, cek lewat /rekap."
+        else:
+            baris = [f"• <b>{w}</b> — {n} respons, pertama {awal}, terakhir {akhir}" for w, n, awal, akhir in ringkasan]
+            pesan = f"🗄️ <b>Arsip {tgl}</b>\n\n" + "\n".join(baris)
+        await update.effective_message.reply_text(pesan, parse_mode="HTML")
+    except Exception as e:
+        logger.error(f"Error pada cmd_arsip: {e}")
+        await update.effective_message.reply_text("⚠️ Gagal membaca arsip.")
+
 # --- START MENU DENGAN KEYBOARD ---
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_name = update.effective_user.first_name
     chat_type = update.effective_chat.type  # Cek tipe chat (private atau group/supergroup)
+    tenant = registry.for_context(update, context)
 
     if chat_type == "private":
+        # Deep link dari tombol grup (?start=reg_<tenant>) -> ingat grup asal user
+        if context.args and context.args[0].startswith("reg_"):
+            tenant = registry.get(context.args[0][4:]) or tenant
+        registry.remember(context, tenant)
         # --- MENU KHUSUS DM (Lengkap dengan Register & Set Hari) ---
         keyboard = [
             [
@@ -99,13 +204,14 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
     else:
         # --- MENU KHUSUS GRUP (Hanya fitur publik) ---
+        registry.remember(context, tenant)
         keyboard = [
             [
                 InlineKeyboardButton("📊 Cek Status", callback_data="menu_cek"),
                 InlineKeyboardButton("📋 List Witel", callback_data="menu_list"),
             ],
             [
-                InlineKeyboardButton("📝 Registrasi PIC (DM)", url=f"https://t.me/{context.bot.username}?start=reg"),
+                InlineKeyboardButton("📝 Registrasi PIC (DM)", url=f"https://t.me/{context.bot.username}?start=reg_{tenant.key}"),
                 InlineKeyboardButton("📘 Panduan", callback_data="menu_panduan")
             ]
         ]
@@ -131,43 +237,73 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif query.data == "menu_sethari_info":
         await query.message.reply_text("Silakan ketik perintah <b>/sethari</b> untuk mengatur jadwal (Admin Only).", parse_mode="HTML")
     elif query.data == "menu_panduan":
-        await query.message.reply_text("Silakan isi Google Form setiap hari sebelum jam 17:00 WITA.")
+        tenant = registry.for_context(update, context)
+        await query.message.reply_text(
+            f"Silakan isi Google Form setiap hari sebelum jam {tenant.jadwal['sore']} {tenant.now().strftime('%Z')}."
+        )
 
 # --- LOGIKA PENGECEKAN DATA ---
-async def dapatkan_status_harian():
-    ss = connect_sheets()
-    sheet_responses = ss.worksheet("Form Responses 1")
-    sheet_pic = ss.worksheet("PIC_LIST")
+async def sync_mirror(td):
+    # Tarik perubahan terbaru dari Sheets ke mirror lokal
+    changed, version = await td.changes.poll("mirror")
+    if not changed and td.mirror.synced_at("pic") is not None:
+        # File tidak berubah = mirror terbukti lengkap sampai sekarang
+        td.mirror.mark_synced("responses")
+        return
+    sheet_pic = await sheets.run(td.tenant.get_sheet, "PIC_LIST")
     
-    now = datetime.datetime.now(TIMEZONE)
-    today = now.strftime('%d/%m/%Y') 
-    
-    all_responses = sheet_responses.get_all_values()
-    master_pic = sheet_pic.get_all_records()
+    # Dua worksheet dibaca paralel di thread pool, event loop tidak ikut menunggu
+    new_rows, master_pic = await asyncio.gather(
+        td.response_log.sync(),
+        sheets.run(sheet_pic.get_all_records),
+    )
+    td.mirror.replace_pic(master_pic)
+    td.submission_index.update(td.response_log, new_rows)
+    td.changes.mark("mirror", version)
+    td.status_harian.invalidate()
+    # Hari yang baru selesai (lewat tengah malam) ditambahkan ke agregat analytics
+    await asyncio.to_thread(td.analytics.refresh)
+
+async def job_sync_mirror(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await sync_mirror(data_job(context))
+    except Exception as e:
+        # Sheets lambat/mati -> bot tetap melayani dari data lokal terakhir
+        logger.error(f"Sinkronisasi mirror {context.job.data} gagal: {e}")
+
+async def baca_pic_lokal(td):
+    if td.mirror.synced_at("pic") is None:
+        # Start pertama kali (mirror masih kosong) -> sinkron dulu
+        await sync_mirror(td)
+    return td.mirror.pic_list()
+
+async def hitung_status_harian(td, now):
+    # Dilayani dari mirror lokal, tanpa menunggu Google
+    master_pic = await baca_pic_lokal(td)
+    td.submission_index.update(td.response_log, [])
     
-    witel_sudah_isi = []
-    for row in all_responses[1:]:
-        try:
-            timestamp_val = str(row[1]) # Kolom ke-2
-            pic_val = str(row[5])       # Kolom ke-6
-            if today in timestamp_val:
-                witel_sudah_isi.append(pic_val)
-        except IndexError:
-            continue
+    # {witel: waktu submit} untuk hari ini -> cek per PIC cukup lookup dict
+    witel_sudah_isi = td.submission_index.witel_on(now.date())
             
-    sudah, belum = [], []
+    witel = {}
     for p in master_pic:
-        w, u = p.get('Witel'), p.get('Username')
-        if w in witel_sudah_isi:
-            sudah.append(f"✅ {w}")
-        else:
-            # Username diletakkan dalam kurung agar bisa di-mention/dilihat
-            belum.append(f"❌ {w} ({u})")
+        w = str(p.get('Witel')).strip()
+        witel[w] = {'username': p.get('Username'), 'waktu': witel_sudah_isi.get(w)}
             
-    return sudah, belum, today
+    return StatusSnapshot(now.date(), witel, now)
+
+async def dapatkan_status_harian(td):
+    snapshot = await td.status_harian.get()
+    sudah = [f"✅ {w}" for w in snapshot.sudah()]
+    # Username diletakkan dalam kurung agar bisa di-mention/dilihat
+    belum = [f"❌ {w} ({snapshot.witel[w]['username']})" for w in snapshot.belum()]
+    return sudah, belum, snapshot.label_tanggal
 
 # --- REMINDER FUNCTIONS ---
 async def kirim_reminder_pagi(context: ContextTypes.DEFAULT_TYPE):
+    td = data_job(context)
+    if not td.tenant.is_hari_kerja():
+        return
     pesan = (
 
         "☀️ <b>MORNING REMINDER: ONE DAY ONE NEWS</b>\n\n"
@@ -179,40 +315,124 @@ async def kirim_reminder_pagi(context: ContextTypes.DEFAULT_TYPE):
         "🔗 <i>Jangan lupa submit melalui Google Form ya!</i>"
 
     )
-    await context.bot.send_message(chat_id=GROUP_CHAT_ID, text=pesan, parse_mode="HTML")
+    await dispatcher.send_message(context.bot, chat_id=td.tenant.chat_id, text=pesan, parse_mode="HTML")
 
 async def kirim_reminder_siang(context: ContextTypes.DEFAULT_TYPE):
+    # Bukan pesan baru lagi: papan status diedit dengan label siang
+    td = data_job(context)
+    if not td.tenant.is_hari_kerja():
+        return
     try:
-        sudah, belum, tgl = await dapatkan_status_harian()
-        pesan = f"🕒 <b>UPDATE STATUS SIANG ({tgl})</b>\n\nBelum Submit:\n" + "\n".join(belum)
-        await context.bot.send_message(chat_id=GROUP_CHAT_ID, text=pesan, parse_mode="HTML")
+        await perbarui_papan_status(context, td, label="🕒 Update Siang")
     except Exception as e:
-        logger.error(f"Error Siang: {e}")
+        logger.error(f"Error Siang ({td.tenant.key}): {e}")
 
 async def kirim_rekap_sore(context: ContextTypes.DEFAULT_TYPE):
+    td = data_job(context)
+    if not td.tenant.is_hari_kerja():
+        return
+    try:
+        await perbarui_papan_status(context, td, label="📊 Rekap Final")
+    except Exception as e:
+        logger.error(f"Error Sore ({td.tenant.key}): {e}")
+
+async def kirim_rekap_berkala(context: ContextTypes.DEFAULT_TYPE):
+    # Rekap mingguan (tiap REKAP_MINGGUAN_HARI) dan bulanan (tiap tanggal 1, bulan lalu)
+    td = data_job(context)
+    hari_ini = td.tenant.now().date()
+    kemarin = hari_ini - datetime.timedelta(days=1)
+    if hari_ini.weekday() != REKAP_MINGGUAN_HARI and hari_ini.day != 1:
+        return
+    try:
+        # Sinkron dulu supaya hari terakhir periode sudah tertutup di agregat
+        await sync_mirror(td)
+        await asyncio.to_thread(td.analytics.refresh)
+        if td.analytics.until is None or td.analytics.until < kemarin:
+            logger.warning(f"Rekap berkala {td.tenant.key} ditunda: agregat baru sampai "
+                           f"{td.analytics.until}, periode berakhir {kemarin}.")
+            return
+        laporan = []
+        if hari_ini.weekday() == REKAP_MINGGUAN_HARI:
+            awal = kemarin - datetime.timedelta(days=6)
+            laporan += await asyncio.to_thread(td.analytics.rekap, awal, kemarin,
+                                               judul="📈 <b>REKAP MINGGUAN ONE DAY ONE NEWS</b>")
+        if hari_ini.day == 1:
+            akhir = kemarin
+            laporan += await asyncio.to_thread(td.analytics.rekap, akhir.replace(day=1), akhir,
+                                               judul=f"📈 <b>REKAP BULANAN {akhir.strftime('%m/%Y')}</b>")
+        for pesan in laporan:
+            await dispatcher.send_message(context.bot, chat_id=td.tenant.chat_id, text=pesan, parse_mode="HTML")
+    except Exception as e:
+        logger.error(f"Error Rekap Berkala ({td.tenant.key}): {e}")
+
+async def job_arsip(context: ContextTypes.DEFAULT_TYPE):
+    # Pindahkan respons lebih tua dari ARCHIVE_RETENTION_DAYS keluar dari Form Responses.
+    # Baris hari ini tidak pernah disentuh; file arsip & ringkasan di mirror ditulis sebelum
+    # baris dihapus, tab ringkasan disusulkan (diulang tiap jalan sampai berhasil).
+    td = data_job(context)
     try:
-        sudah, belum, tgl = await dapatkan_status_harian()
-        teks = f"📊 <b>REKAP FINAL ({tgl})</b>\n\nSudah:\n" + "\n".join(sudah)
-        await context.bot.send_message(chat_id=GROUP_CHAT_ID, text=teks, parse_mode="HTML")
+        await sync_mirror(td)
+        await td.response_log.archive_head(td.archive.select, td.archive.store)
+        await sheets.run(td.archive.sync_summary_tab)
     except Exception as e:
-        logger.error(f"Error Sore: {e}")
+        logger.error(f"Error Arsip ({td.tenant.key}): {e}")
+
+# --- PAPAN STATUS LIVE ---
+async def perbarui_papan_status(context: ContextTypes.DEFAULT_TYPE, td, label=None):
+    sudah, belum, tgl = await dapatkan_status_harian(td)
+    waktu = td.tenant.now().strftime('%H:%M %Z')
+    await status_board.refresh(context.bot, td.tenant.chat_id, sudah, belum, tgl, waktu, label=label)
+
+async def job_papan_status(context: ContextTypes.DEFAULT_TYPE):
+    # Hanya di hari kerja; papan dibuat sekali per hari lalu diedit bila berubah
+    td = data_job(context)
+    if not td.tenant.is_hari_kerja():
+        return
+    try:
+        await perbarui_papan_status(context, td)
+    except Exception as e:
+        logger.error(f"Error Papan Status ({td.tenant.key}): {e}")
+
+async def post_shutdown(application):
+    # Lepas lease supaya instance lain langsung bisa mengambil alih jadwal
+    election.release()
+    await sheets.on_shutdown(application)
 
 # --- MAIN ---
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(os.getenv("TELEGRAM_TOKEN")).build()
-    app.bot_data['hari_kerja'] = [0, 1, 2, 3, 4] 
+    app = ApplicationBuilder().token(os.getenv("TELEGRAM_TOKEN")).request(metrics.telegram_request()).post_shutdown(post_shutdown).build()
     
     # Daftarkan semua handler
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("cek", cmd_cek))
     app.add_handler(CommandHandler("list", cmd_list)) # PENTING: Tambahkan ini
+    app.add_handler(CommandHandler("rekap", cmd_rekap))
+    app.add_handler(CommandHandler("arsip", cmd_arsip))
     app.add_handler(get_admin_handler())
     app.add_handler(CallbackQueryHandler(button_handler))
 
     job_queue = app.job_queue
-    job_queue.run_once(kirim_reminder_pagi, when=5)
-    job_queue.run_once(kirim_reminder_siang, when=10)
-    job_queue.run_once(kirim_rekap_sore, when=15)
+    job_queue.run_repeating(election.job_renew, interval=LEADER_LEASE / 3, first=0)
+    for i, tenant in enumerate(registry):
+        # Tiap tenant digeser beberapa detik supaya tidak menembak API bersamaan.
+        # Sinkronisasi mirror jalan di semua instance (tiap instance melayani /cek),
+        # pesan ke grup hanya dari leader.
+        jeda = i * TENANT_STAGGER
+        job_queue.run_repeating(job_sync_mirror, interval=MIRROR_SYNC_INTERVAL, first=1 + jeda,
+                                data=tenant.key, name=f"sync:{tenant.key}")
+        job_queue.run_daily(election.only_leader(kirim_reminder_pagi), time=tenant.waktu("pagi", jeda),
+                            data=tenant.key, name=f"pagi:{tenant.key}")
+        job_queue.run_daily(election.only_leader(kirim_reminder_siang), time=tenant.waktu("siang", jeda),
+                            data=tenant.key, name=f"siang:{tenant.key}")
+        job_queue.run_daily(election.only_leader(kirim_rekap_sore), time=tenant.waktu("sore", jeda),
+                            data=tenant.key, name=f"sore:{tenant.key}")
+        job_queue.run_daily(election.only_leader(kirim_rekap_berkala), time=tenant.waktu("rekap", jeda),
+                            data=tenant.key, name=f"rekap:{tenant.key}")
+        job_queue.run_daily(election.only_leader(job_arsip), time=tenant.waktu("arsip", jeda),
+                            data=tenant.key, name=f"arsip:{tenant.key}")
+        job_queue.run_repeating(election.only_leader(job_papan_status), interval=STATUS_BOARD_INTERVAL, first=20 + jeda,
+                                data=tenant.key, name=f"papan:{tenant.key}")
 
-    print("🚀 Bot sedang berjalan. Cek grup Telegram...")
-    app.run_polling()
\ No newline at end of file
+    print(f"🚀 Bot sedang berjalan untuk {len(registry)} grup. Cek grup Telegram...")
+    # Polling atau webhook, dipilih lewat BOT_MODE di .env
+    webhook.run(app)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import time
+import logging
+from gspread.urls import DRIVE_FILES_API_V3_URL
+import sheets
+
+# --- KONFIGURASI ---
+# Metadata Drive dipakai bersama semua job selama beberapa detik (satu tick)
+CHANGE_CHECK_TTL = float(os.getenv("CHANGE_CHECK_TTL", "5"))
+# Walau metadata bilang tidak berubah, paksa baca penuh setelah selang ini (detik)
+CHANGE_MAX_AGE = float(os.getenv("CHANGE_MAX_AGE", str(15 * 60)))
+
+logger = logging.getLogger(__name__)
+
+
+# --- SUMBER METADATA ---
+class DriveMetadataSource:
+    # Satu request kecil ke Drive API: versi file naik setiap ada perubahan isi
+    def __init__(self, get_spreadsheet):
+        self.get_spreadsheet = get_spreadsheet
+
+    def version(self):
+        ss = self.get_spreadsheet()
+        client = ss.client
+        request = getattr(client, "request", None) or client.http_client.request
+        resp = request("get", f"{DRIVE_FILES_API_V3_URL}/{ss.id}",
+                       params={"fields": "version,modifiedTime", "supportsAllDrives": True})
+        meta = resp.json()
+        return f"{meta.get('version')}:{meta.get('modifiedTime')}"
+
+
+class FakeMetadataSource:
+    # Untuk tes/benchmark: versi hanya berubah saat bump() dipanggil
+    def __init__(self):
+        self.counter = 0
+        self.calls = 0
+
+    def bump(self):
+        self.counter += 1
+
+    def version(self):
+        self.calls += 1
+        return str(self.counter)
+
+
+# --- DETEKTOR PERUBAHAN ---
+# Pola pemakaian di job:
+#   changed, version = await detector.poll("tasks")
+#   if changed:
+#       ... baca penuh & proses ...
+#       detector.mark("tasks", version)
+class ChangeDetector:
+    def __init__(self, source, ttl=CHANGE_CHECK_TTL, max_age=CHANGE_MAX_AGE):
+        self.source = source
+        self.ttl = ttl
+        self.max_age = max_age
+        self._version = None
+        self._checked_at = 0.0
+        self._seen = {}   # consumer -> (versi, waktu mark)
+
+    async def current_version(self):
+        if self._version is None or time.monotonic() - self._checked_at >= self.ttl:
+            self._version = await sheets.run(self.source.version)
+            self._checked_at = time.monotonic()
+        return self._version
+
+    async def poll(self, consumer):
+        try:
+            version = await self.current_version()
+        except Exception as e:
+            # Metadata gagal dibaca -> anggap berubah, biar data tidak basi
+            logger.warning(f"Cek metadata gagal, baca penuh: {e}")
+            return True, None
+        seen = self._seen.get(consumer)
+        if seen is None or seen[0] != version or time.monotonic() - seen[1] >= self.max_age:
+            return True, version
+        return False, version
+
+    def mark(self, consumer, version):
+        if version is not None:
+            self._seen[consumer] = (version, time.monotonic())
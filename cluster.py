@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import functools
+import logging
+
+# --- KONFIGURASI ---
+# State bersama antar instance bot (pengaturan bot-wide + lease leader).
+# SQLite di disk bersama dipakai sebagai backend lokal; semua instance menunjuk file yang sama.
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "shared_state.db")
+# Lama lease leader (detik). Diperpanjang tiap LEADER_LEASE / 3 detik.
+LEADER_LEASE = float(os.getenv("LEADER_LEASE", "30"))
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+logger = logging.getLogger(__name__)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires_at REAL);
+"""
+
+
+def get_shared_state():
+    # Satu koneksi per proses
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SharedState()
+        return _shared
+
+
+# --- STATE BERSAMA ---
+class SharedState:
+    def __init__(self, path=SHARED_STATE_DB):
+        self.path = path
+        # timeout: instance lain mungkin sedang menulis -> tunggu, jangan langsung error
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _exec(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- PENGATURAN BOT-WIDE ---
+    def get_setting(self, key, default=None):
+        rows = self._exec("SELECT value FROM settings WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_setting(self, key, value):
+        self._exec("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # --- LEASE ---
+    def try_acquire(self, name, owner, ttl):
+        # Satu statement atomik: ambil lease kalau kosong, milik sendiri, atau sudah kadaluarsa
+        now = time.time()
+        self._exec(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, owner, now + ttl, now),
+        )
+        rows = self._exec("SELECT owner, expires_at FROM leases WHERE name = ?", (name,))
+        return rows[0] if rows else (None, 0.0)
+
+    def release(self, name, owner):
+        self._exec("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- LEADER ELECTION ---
+# Semua instance menjadwalkan job yang sama, tapi hanya pemegang lease yang
+# benar-benar menjalankannya (pesan grup tidak terkirim dobel).
+class LeaderElection:
+    def __init__(self, state, name="scheduler", owner=INSTANCE_ID, lease=LEADER_LEASE):
+        self.state = state
+        self.name = name
+        self.owner = owner
+        self.lease = lease
+        self._expires_at = 0.0
+
+    @property
+    def is_leader(self):
+        # Masih dianggap leader hanya selama lease yang terakhir diperpanjang belum habis
+        return time.time() < self._expires_at
+
+    def renew(self):
+        pernah_leader = self.is_leader
+        try:
+            owner, expires_at = self.state.try_acquire(self.name, self.owner, self.lease)
+        except sqlite3.Error as e:
+            logger.error(f"Gagal memperpanjang lease {self.name}: {e}")
+            return self.is_leader
+        self._expires_at = expires_at if owner == self.owner else 0.0
+        if self.is_leader != pernah_leader:
+            logger.info(f"Instance {self.owner} {'menjadi' if self.is_leader else 'bukan lagi'} leader {self.name}.")
+        return self.is_leader
+
+    async def job_renew(self, context):
+        # Dipasang via job_queue.run_repeating(election.job_renew, interval=lease / 3)
+        self.renew()
+
+    def release(self):
+        if self.is_leader:
+            self.state.release(self.name, self.owner)
+            self._expires_at = 0.0
+
+    def only_leader(self, callback):
+        # Bungkus callback job: instance non-leader langsung keluar
+        @functools.wraps(callback)
+        async def wrapper(context):
+            if not self.is_leader:
+                return
+            return await callback(context)
+        return wrapper
@@ -0,0 +1,88 @@
+import os
+import time
+import asyncio
+import datetime
+import logging
+
+# --- KONFIGURASI ---
+# Berapa detik snapshot status harian dipakai bersama sebelum dihitung ulang
+STATUS_SNAPSHOT_TTL = float(os.getenv("STATUS_SNAPSHOT_TTL", "15"))
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_username(value):
+    # "@Evita_VP " dan "evita_vp" dianggap sama
+    return str(value or "").strip().lstrip("@").casefold()
+
+
+# --- SNAPSHOT STATUS HARIAN ---
+class StatusSnapshot:
+    def __init__(self, tanggal, witel, refreshed_at):
+        self.tanggal = tanggal            # datetime.date
+        self.witel = witel                # witel -> {'username', 'waktu' (None = belum submit)}, urut PIC_LIST
+        self.refreshed_at = refreshed_at  # datetime (aware) saat snapshot dihitung
+        # username ternormalisasi -> [witel]; satu PIC bisa memegang beberapa Witel,
+        # satu sel juga bisa berisi beberapa username dipisah koma
+        self.by_username = {}
+        for w, s in witel.items():
+            for u in str(s['username'] or "").split(","):
+                key = normalize_username(u)
+                if key:
+                    self.by_username.setdefault(key, []).append(w)
+
+    @property
+    def label_tanggal(self):
+        return self.tanggal.strftime('%d/%m/%Y')
+
+    def sudah(self):
+        return [w for w, s in self.witel.items() if s['waktu'] is not None]
+
+    def belum(self):
+        return [w for w, s in self.witel.items() if s['waktu'] is None]
+
+    def status_for(self, *usernames):
+        # -> [(witel, waktu submit atau None)] untuk username pertama yang terdaftar
+        for u in usernames:
+            witel = self.by_username.get(normalize_username(u))
+            if witel:
+                return [(w, self.witel[w]['waktu']) for w in witel]
+        return []
+
+
+# --- PENYEDIA SNAPSHOT (SINGLE-FLIGHT) ---
+# /cek, tombol Cek Status, rekap siang/sore & papan status memakai snapshot yang
+# sama. Pemanggil bersamaan menunggu satu perhitungan, bukan menghitung sendiri.
+class DailyStatus:
+    def __init__(self, compute, tz, ttl=STATUS_SNAPSHOT_TTL):
+        self.compute = compute   # async fn(now) -> StatusSnapshot
+        self.tz = tz
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self, now):
+        return (
+            self._snapshot is not None
+            and self._snapshot.tanggal == now.date()
+            and (time.monotonic() - self._loaded_at) < self.ttl
+        )
+
+    async def get(self):
+        now = datetime.datetime.now(self.tz)
+        if self.is_fresh(now):
+            return self._snapshot
+        async with self._lock:
+            # Bisa jadi pemanggil lain sudah selesai menghitung selagi kita menunggu
+            if self.is_fresh(now):
+                return self._snapshot
+            self._snapshot = await self.compute(now)
+            self._loaded_at = time.monotonic()
+            logger.info(f"Snapshot status {self._snapshot.label_tanggal} dihitung ulang "
+                        f"({len(self._snapshot.sudah())}/{len(self._snapshot.witel)} sudah submit).")
+            return self._snapshot
+
+    def invalidate(self):
+        # Dipanggil setelah sinkronisasi membawa data baru
+        self._loaded_at = 0.0
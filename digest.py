@@ -0,0 +1,137 @@
+import os
+import html
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+# --- KONFIGURASI ---
+# REMINDER_MODE=digest -> semua tugas pending dikemas dalam sesedikit mungkin pesan
+REMINDER_MODE = os.getenv("REMINDER_MODE", "single")
+DIGEST_PER_PAGE = int(os.getenv("DIGEST_PER_PAGE", "8"))
+MAX_MESSAGE_LENGTH = 4096   # batas teks satu pesan Telegram
+
+DIGEST_HEADER = "📢 <b>REMINDER ARTIKEL</b> ({total} belum submit){bagian}\n\n"
+DIGEST_FOOTER = "\n\n👇 <i>Klik tombol di bawah jika sudah upload:</i>"
+
+
+def is_enabled():
+    return REMINDER_MODE.lower() == "digest"
+
+
+# --- PEMBUATAN PESAN DIGEST ---
+def build_messages(chat_id, pending):
+    # pending: list baris tugas (dict dari get_all_records)
+    budget = line_budget(len(pending))
+    lines = [digest_line(i, row, budget) for i, row in enumerate(pending, 1)]
+    texts = pack_messages(lines, len(pending))
+    messages = [dict(chat_id=chat_id, text=t, parse_mode="HTML") for t in texts]
+    if messages:
+        # Keyboard "Sudah Submit" (berhalaman) hanya di pesan terakhir
+        messages[-1]['reply_markup'] = build_keyboard(pending)
+    return messages
+
+
+def digest_line(i, row, budget):
+    # Isi dari Sheets di-escape; yang dipotong teks polosnya, baru dibungkus tag,
+    # supaya <b>...</b> tidak pernah terbelah ("can't parse entities")
+    ekor = f" — {_potong(row['penulis'], 100)} (⏰ {_potong(row['deadline'], 50)})"
+    kepala = f"{i}. "
+    judul = _potong(row['judul'], budget - len(kepala) - len(ekor) - len("<b></b>"))
+    return f"{kepala}<b>{judul}</b>{ekor}"
+
+
+def _potong(teks, maks):
+    # -> teks ter-escape dengan panjang <= maks (dipotong di teks asli, diberi "..")
+    teks = str(teks)
+    if len(html.escape(teks)) <= maks:
+        return html.escape(teks)
+    n = min(len(teks), maks)
+    while n > 0 and len(html.escape(teks[:n])) + 2 > maks:
+        n -= 1
+    return html.escape(teks[:n]) + ".." if n else ""
+
+
+def line_budget(total, limit=MAX_MESSAGE_LENGTH):
+    # Header diberi ruang untuk penanda "(bagian x/y)"
+    header_len = len(DIGEST_HEADER.format(total=total, bagian=" (bagian 99/99)"))
+    return limit - header_len - len(DIGEST_FOOTER)
+
+
+def pack_messages(lines, total, limit=MAX_MESSAGE_LENGTH):
+    # lines sudah dijamin <= line_budget() (lihat digest_line); tidak dipotong di sini
+    # karena bisa berisi markup HTML
+    budget = line_budget(total, limit)
+    chunks, current = [], []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > budget:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append(current)
+
+    texts = []
+    for n, chunk in enumerate(chunks, 1):
+        bagian = f" (bagian {n}/{len(chunks)})" if len(chunks) > 1 else ""
+        teks = DIGEST_HEADER.format(total=total, bagian=bagian) + "\n".join(chunk)
+        if n == len(chunks):
+            teks += DIGEST_FOOTER
+        texts.append(teks)
+    return texts
+
+
+# --- KEYBOARD BERHALAMAN ---
+# Tombol tugas tetap memakai callback "done_<id>" (logika tombol lama),
+# navigasi halaman memakai "digest_<halaman>".
+def build_keyboard(pending, page=0, per_page=DIGEST_PER_PAGE):
+    total_pages = max(1, -(-len(pending) // per_page))
+    page = min(max(page, 0), total_pages - 1)
+    start = page * per_page
+
+    keyboard = []
+    for row in pending[start:start + per_page]:
+        judul = str(row['judul'])
+        judul_pendek = (judul[:30] + '..') if len(judul) > 30 else judul
+        keyboard.append([InlineKeyboardButton(f"✅ {judul_pendek}", callback_data=f"done_{row['id']}")])
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("◀️", callback_data=f"digest_{page - 1}"))
+    nav.append(InlineKeyboardButton(f"{page + 1}/{total_pages}", callback_data=f"digest_{page}"))
+    if page < total_pages - 1:
+        nav.append(InlineKeyboardButton("▶️", callback_data=f"digest_{page + 1}"))
+    keyboard.append(nav)
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def refresh_keyboard(query, pending, page):
+    # Ganti keyboard pesan digest (halaman lain / tugas yang sudah selesai hilang)
+    try:
+        await query.edit_message_reply_markup(reply_markup=build_keyboard(pending, page))
+    except BadRequest:
+        # "Message is not modified" -> isi keyboard sama, abaikan
+        pass
+
+
+def parse_page(data):
+    try:
+        return int(data.split("_")[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def is_digest(message):
+    return current_page(message) is not None
+
+
+def current_page(message):
+    # Halaman aktif dibaca dari tombol penanda "x/y" di baris navigasi
+    markup = getattr(message, "reply_markup", None)
+    if not markup or not markup.inline_keyboard:
+        return None
+    for button in markup.inline_keyboard[-1]:
+        data = button.callback_data or ""
+        if data.startswith("digest_") and "/" in button.text:
+            return parse_page(data)
+    return None
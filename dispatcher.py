@@ -0,0 +1,152 @@
+import os
+import time
+import asyncio
+import logging
+from telegram.error import RetryAfter, BadRequest, NetworkError
+
+# --- KONFIGURASI ---
+# Batas Telegram: ~30 pesan/detik total, ~1 pesan/detik per chat, ~20 pesan/menit per grup
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "25"))       # pesan/detik
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))            # pesan/detik (chat pribadi)
+SEND_GROUP_RATE = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))  # pesan/detik (grup)
+SEND_GROUP_BURST = int(os.getenv("SEND_GROUP_BURST", "5"))
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "8"))
+SEND_MAX_RETRY = int(os.getenv("SEND_MAX_RETRY", "3"))
+SEND_RETRY_BACKOFF = float(os.getenv("SEND_RETRY_BACKOFF", "1"))   # detik, dikali 2 tiap percobaan (timeout/jaringan)
+
+logger = logging.getLogger(__name__)
+
+
+# --- TOKEN BUCKET ---
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        # Dipakai saat Telegram membalas RetryAfter
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DispatchReport:
+    def __init__(self):
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.results = []
+        self.last_error = None   # exception terakhir (untuk pemanggil yang perlu membedakan penyebab gagal)
+
+    def __str__(self):
+        return f"antre={self.queued}, terkirim={self.sent}, gagal={self.failed}"
+
+
+# --- DISPATCHER PESAN KELUAR ---
+# Semua jalur kirim (reminder grup, siang, sore, pagi) lewat sini supaya
+# tidak kena flood limit Telegram dan RetryAfter ditangani otomatis.
+class Dispatcher:
+    def __init__(self, concurrency=SEND_CONCURRENCY, max_retry=SEND_MAX_RETRY):
+        self.global_bucket = TokenBucket(SEND_GLOBAL_RATE, max(1, int(SEND_GLOBAL_RATE)))
+        self.chat_buckets = {}
+        self.max_retry = max_retry
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.total = DispatchReport()
+
+    def _chat_bucket(self, chat_id):
+        key = str(chat_id)
+        bucket = self.chat_buckets.get(key)
+        if bucket is None:
+            # ID grup/supergroup selalu negatif, @channel juga dianggap grup
+            if key.lstrip("-").isdigit() and int(key) > 0:
+                bucket = TokenBucket(SEND_CHAT_RATE, 1)
+            else:
+                bucket = TokenBucket(SEND_GROUP_RATE, SEND_GROUP_BURST)
+            self.chat_buckets[key] = bucket
+        return bucket
+
+    async def send_message(self, bot, chat_id, text, report=None, **kwargs):
+        # Mengembalikan Message, atau None kalau tetap gagal setelah retry
+        return await self._call(bot.send_message, chat_id, report, text=text, **kwargs)
+
+    async def edit_message_text(self, bot, chat_id, message_id, text, report=None, **kwargs):
+        return await self._call(bot.edit_message_text, chat_id, report,
+                                message_id=message_id, text=text, **kwargs)
+
+    async def _call(self, method, chat_id, report, **kwargs):
+        report = report or DispatchReport()
+        report.queued += 1
+        self.total.queued += 1
+        chat_bucket = self._chat_bucket(chat_id)
+        for attempt in range(self.max_retry + 1):
+            tunggu = 0
+            # Antre di bucket chat dulu, baru ambil slot concurrency + bucket global
+            await chat_bucket.acquire()
+            async with self._semaphore:
+                await self.global_bucket.acquire()
+                try:
+                    message = await method(chat_id=chat_id, **kwargs)
+                    report.sent += 1
+                    self.total.sent += 1
+                    return message
+                except RetryAfter as e:
+                    report.last_error = e
+                    wait = _seconds(e.retry_after)
+                    logger.warning(f"Flood control chat {chat_id}, tunggu {wait} detik (percobaan {attempt + 1}).")
+                    # 429 juga membatasi bot secara keseluruhan, bukan hanya chat ini
+                    chat_bucket.pause(wait)
+                    self.global_bucket.pause(wait)
+                except BadRequest as e:
+                    # Turunan NetworkError, tapi permanen (pesan tidak valid) -> tidak diulang
+                    report.last_error = e
+                    logger.error(f"Gagal kirim pesan ke {chat_id}: {e}")
+                    break
+                except NetworkError as e:
+                    # Termasuk TimedOut: gangguan sementara -> diulang dengan backoff
+                    report.last_error = e
+                    if attempt < self.max_retry:
+                        tunggu = SEND_RETRY_BACKOFF * 2 ** attempt
+                        logger.warning(f"Gangguan jaringan ke {chat_id} ({e}), coba lagi dalam {tunggu:.0f} detik "
+                                       f"(percobaan {attempt + 1}).")
+                    else:
+                        logger.error(f"Gagal kirim pesan ke {chat_id}: {e}")
+                except Exception as e:
+                    report.last_error = e
+                    logger.error(f"Gagal kirim pesan ke {chat_id}: {e}")
+                    break
+            if tunggu:
+                # Di luar semaphore supaya pesan lain tetap jalan selama menunggu
+                await asyncio.sleep(tunggu)
+        report.failed += 1
+        self.total.failed += 1
+        return None
+
+    async def send_many(self, bot, messages):
+        # messages: list of dict berisi argumen send_message (chat_id, text, ...)
+        # report.results berisi Message (atau None) sesuai urutan messages
+        report = DispatchReport()
+        report.results = await asyncio.gather(*(self.send_message(bot, report=report, **m) for m in messages))
+        return report
+
+
+def _seconds(retry_after):
+    # PTB baru memakai timedelta, versi lama int
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
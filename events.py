@@ -0,0 +1,152 @@
+import os
+import json
+import queue
+import atexit
+import datetime
+import threading
+import contextlib
+import contextvars
+import logging
+import logging.handlers
+
+# --- KONFIGURASI ---
+# Log event terstruktur: satu baris JSON per update, job, panggilan Sheets & Telegram.
+# Ditulis thread terpisah (event loop hanya memasukkan ke antrean), dirotasi per ukuran.
+EVENT_LOG_FILE = os.getenv("EVENT_LOG_FILE", "events.jsonl")
+EVENT_LOG_MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+EVENT_LOG_BACKUPS = int(os.getenv("EVENT_LOG_BACKUPS", "5"))
+# Antrean penuh (disk lambat) -> event dibuang & dihitung, handler tidak pernah menunggu
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+logger = logging.getLogger(__name__)
+
+# Field yang ikut ke setiap event di konteks yang sama (update_id, job).
+# Ikut terbawa ke thread pool Sheets lewat contextvars.copy_context (lihat sheets.run).
+_context = contextvars.ContextVar("event_context", default={})
+_STOP = object()
+
+
+# --- KONTEKS ---
+@contextlib.contextmanager
+def bind(**fields):
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current(field):
+    return _context.get().get(field)
+
+
+# --- PENULIS LATAR BELAKANG ---
+class EventWriter:
+    def __init__(self, path=EVENT_LOG_FILE, max_bytes=EVENT_LOG_MAX_BYTES,
+                 backups=EVENT_LOG_BACKUPS, maxsize=EVENT_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, record):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        f = open(self.path, "ab")
+        try:
+            while True:
+                record = self.queue.get()
+                if record is _STOP:
+                    break
+                # Serialisasi juga di thread ini, bukan di event loop
+                line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                try:
+                    if self.max_bytes and f.tell() and f.tell() + len(line) > self.max_bytes:
+                        f = self._rotate(f)
+                    f.write(line)
+                    if self.queue.empty():
+                        f.flush()
+                except OSError as e:
+                    self.dropped += 1
+                    logger.error(f"Gagal menulis event log {self.path}: {e}")
+        finally:
+            f.close()
+
+    def _rotate(self, f):
+        # events.jsonl -> events.jsonl.1 -> ... -> events.jsonl.N (yang paling lama dibuang)
+        f.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                lama = f"{self.path}.{i}"
+                if os.path.exists(lama):
+                    os.replace(lama, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+            return open(self.path, "ab")
+        return open(self.path, "wb")
+
+    def stop(self, timeout=5):
+        # Dipanggil saat proses keluar: sisa antrean ditulis dulu
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+writer = EventWriter()
+
+
+def emit(event, **fields):
+    # Aman dipanggil dari event loop maupun thread pool: tidak pernah blocking
+    record = {
+        "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"),
+        "event": event,
+        "update_id": None,
+    }
+    record.update(_context.get())
+    record.update(fields)
+    writer.put(record)
+
+
+# --- LOGGING TEKS (bot.log) ---
+def setup_logging(filename=None, level=logging.INFO, format=LOG_FORMAT):
+    # Pengganti logging.basicConfig: handler file & console dijalankan QueueListener
+    # di thread sendiri, logger di event loop hanya memasukkan record ke antrean.
+    handlers = [logging.StreamHandler()]
+    if filename:
+        handlers.insert(0, logging.FileHandler(filename))
+    formatter = logging.Formatter(format)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,214 @@
+import re
+import time
+import asyncio
+import itertools
+from collections import Counter
+from types import SimpleNamespace
+from gspread.utils import a1_to_rowcol
+
+# Pengganti gspread & Telegram Bot di memori untuk benchmark / uji lokal.
+# Semua panggilan "remote" dihitung per method, dan bisa diberi latency buatan.
+
+
+# --- GOOGLE SHEETS ---
+class FakeWorksheet:
+    def __init__(self, title, rows, latency=0.0, calls=None):
+        self.title = title
+        self.rows = [list(r) for r in rows]   # baris 1 = header
+        self.latency = latency                # detik per panggilan (time.sleep, jalan di thread pool)
+        self.calls = calls if calls is not None else Counter()
+
+    def _remote(self, method):
+        self.calls[f"sheets.{method}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _cell(self, row, col):
+        try:
+            return self.rows[row - 1][col - 1]
+        except IndexError:
+            return ""
+
+    # --- BACA ---
+    def get_all_values(self):
+        self._remote("get_all_values")
+        return [list(r) for r in self.rows]
+
+    def get_all_records(self):
+        self._remote("get_all_records")
+        header = self.rows[0] if self.rows else []
+        return [
+            {h: _numericise(r[i] if i < len(r) else "") for i, h in enumerate(header)}
+            for r in self.rows[1:]
+        ]
+
+    def col_values(self, col):
+        self._remote("col_values")
+        return [self._cell(r, col) for r in range(1, len(self.rows) + 1)]
+
+    def batch_get(self, ranges):
+        self._remote("batch_get")
+        return [self._range(a1) for a1 in ranges]
+
+    def find(self, query, in_column=None):
+        self._remote("find")
+        for r, row in enumerate(self.rows, 1):
+            for c, value in enumerate(row, 1):
+                if (in_column is None or c == in_column) and str(value) == str(query):
+                    return SimpleNamespace(row=r, col=c, value=value)
+        return None
+
+    def _range(self, a1):
+        # Cukup untuk bentuk yang dipakai bot: "1:1", "A5:F", "B2:C10", "A7"
+        awal, akhir = a1.split(":") if ":" in a1 else (a1, a1)
+        r1, c1 = _parse_a1(awal, 1, 1)
+        r2, c2 = _parse_a1(akhir, len(self.rows), max((len(r) for r in self.rows), default=0))
+        hasil = [list(row[c1 - 1:c2]) for row in self.rows[r1 - 1:r2]]
+        while hasil and not any(hasil[-1]):
+            hasil.pop()
+        return hasil
+
+    # --- TULIS ---
+    def update_cell(self, row, col, value):
+        self._remote("update_cell")
+        self._set(row, col, value)
+
+    def batch_update(self, data):
+        self._remote("batch_update")
+        for item in data:
+            row, col = a1_to_rowcol(item['range'])
+            self._set(row, col, item['values'][0][0])
+
+    def append_row(self, values):
+        self._remote("append_row")
+        self.rows.append(list(values))
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        baris = self.rows[row - 1]
+        while len(baris) < col:
+            baris.append("")
+        baris[col - 1] = value
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets, id="fake-spreadsheet"):
+        self.id = id
+        self._worksheets = {ws.title: ws for ws in worksheets}
+
+    def worksheet(self, name):
+        return self._worksheets[name]
+
+    @property
+    def sheet1(self):
+        return next(iter(self._worksheets.values()))
+
+
+def _parse_a1(bagian, default_row, default_col):
+    huruf, angka = re.fullmatch(r"([A-Z]*)(\d*)", bagian).groups()
+    row = int(angka) if angka else default_row
+    col = a1_to_rowcol(f"{huruf}1")[1] if huruf else default_col
+    return row, col
+
+
+def _numericise(value):
+    # Meniru get_all_records gspread: "12" -> 12
+    if isinstance(value, str) and value.lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+# --- TELEGRAM ---
+class FakeBot:
+    def __init__(self, latency=0.0, calls=None, username="fake_bot"):
+        self.latency = latency
+        self.calls = calls if calls is not None else Counter()
+        self.username = username
+        self._ids = itertools.count(1)
+
+    async def _remote(self, method):
+        self.calls[f"telegram.{method}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        await self._remote("send_message")
+        return FakeMessage(self, chat_id, text, reply_markup, message_id=next(self._ids))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, reply_markup=None, **kwargs):
+        await self._remote("edit_message_text")
+        return FakeMessage(self, chat_id, text, reply_markup, message_id=message_id)
+
+    async def edit_message_reply_markup(self, chat_id=None, message_id=None, reply_markup=None, **kwargs):
+        await self._remote("edit_message_reply_markup")
+        return FakeMessage(self, chat_id, "", reply_markup, message_id=message_id)
+
+    async def pin_chat_message(self, chat_id, message_id, **kwargs):
+        await self._remote("pin_chat_message")
+        return True
+
+    async def unpin_chat_message(self, chat_id, message_id=None, **kwargs):
+        await self._remote("unpin_chat_message")
+        return True
+
+
+class FakeMessage:
+    def __init__(self, bot, chat_id, text, reply_markup=None, message_id=None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.chat = SimpleNamespace(id=chat_id, type="private" if int(chat_id) > 0 else "supergroup")
+        self.text = text
+        self.reply_markup = reply_markup
+        self.message_id = message_id
+
+    async def reply_text(self, text, **kwargs):
+        return await self.bot.send_message(self.chat_id, text, **kwargs)
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot, data, message, from_user):
+        self.bot = bot
+        self.data = data
+        self.message = message
+        self.from_user = from_user
+
+    async def answer(self, *args, **kwargs):
+        await self.bot._remote("answer_callback_query")
+        return True
+
+    async def edit_message_text(self, text, **kwargs):
+        return await self.bot.edit_message_text(text, chat_id=self.message.chat_id,
+                                                message_id=self.message.message_id, **kwargs)
+
+    async def edit_message_reply_markup(self, reply_markup=None, **kwargs):
+        self.message.reply_markup = reply_markup
+        return await self.bot.edit_message_reply_markup(chat_id=self.message.chat_id,
+                                                        message_id=self.message.message_id,
+                                                        reply_markup=reply_markup, **kwargs)
+
+
+def fake_user(username="pic_bench", first_name="Bench", id=1001):
+    return SimpleNamespace(id=id, username=username, first_name=first_name)
+
+
+def fake_update(bot, chat_id, user=None, text="", callback_data=None, message=None):
+    # Update minimal: cukup atribut yang dibaca handler bot
+    user = user or fake_user()
+    message = message or FakeMessage(bot, chat_id, text, message_id=0)
+    query = FakeCallbackQuery(bot, callback_data, message, user) if callback_data else None
+    return SimpleNamespace(
+        update_id=0,
+        effective_user=user,
+        effective_chat=message.chat,
+        effective_message=message,
+        message=None if query else message,
+        callback_query=query,
+    )
+
+
+def fake_context(bot, job_data=None):
+    return SimpleNamespace(
+        bot=bot, bot_data={}, user_data={}, chat_data={}, args=[],
+        job=SimpleNamespace(data=job_data),
+    )
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+# --- KONFIGURASI ---
+# Reminder tugas yang sama baru dikirim ulang setelah cool-down ini (detik)
+REMINDER_COOLDOWN = float(os.getenv("REMINDER_COOLDOWN", str(6 * 3600)))
+REMINDER_LEDGER_FILE = os.getenv("REMINDER_LEDGER_FILE", "reminder_ledger.json")
+
+SEND, EDIT, SKIP = "send", "edit", "skip"
+
+logger = logging.getLogger(__name__)
+
+
+# --- LEDGER REMINDER ---
+# Mencatat kapan tiap tugas terakhir diingatkan dan message_id yang dipakai.
+# Tick job yang datanya tidak berubah -> tidak ada panggilan ke Telegram.
+class ReminderLedger:
+    def __init__(self, path=REMINDER_LEDGER_FILE, cooldown=REMINDER_COOLDOWN):
+        self.path = path
+        self.cooldown = cooldown
+        self.entries = {}   # key -> {'sent_at', 'message_id', 'chat_id', 'fingerprint'}
+        self._load()
+
+    def decide(self, key, fingerprint):
+        entry = self.entries.get(str(key))
+        if entry is None or time.time() - entry['sent_at'] >= self.cooldown:
+            return SEND
+        if entry['fingerprint'] != fingerprint:
+            # Data tugas berubah (judul/deadline) -> cukup edit pesan lama
+            return EDIT if entry.get('message_id') else SEND
+        return SKIP
+
+    def get(self, key):
+        return self.entries.get(str(key))
+
+    def record_sent(self, key, fingerprint, message):
+        self.entries[str(key)] = {
+            'sent_at': time.time(),
+            'message_id': message.message_id,
+            'chat_id': message.chat_id,
+            'fingerprint': fingerprint,
+        }
+
+    def record_edit(self, key, fingerprint):
+        self.entries[str(key)]['fingerprint'] = fingerprint
+
+    def prune(self, active_keys):
+        # Tugas yang sudah tidak pending tidak perlu diingat lagi
+        active = {str(k) for k in active_keys}
+        for key in [k for k in self.entries if k not in active]:
+            del self.entries[key]
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ledger reminder tidak bisa dibaca, mulai dari kosong: {e}")
+            self.entries = {}
+
+
+def fingerprint(message):
+    # Sidik jari isi pesan (teks + tombol) untuk mendeteksi perubahan data
+    markup = message.get('reply_markup')
+    raw = message['text'] + (json.dumps(markup.to_dict(), sort_keys=True) if markup else "")
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# --- KIRIM DENGAN DE-DUPLIKASI ---
+async def kirim_dengan_ledger(bot, dispatcher, ledger, items):
+    # items: list of (key, argumen send_message). Mengembalikan (terkirim, diedit, dilewati, gagal).
+    kirim, edit = [], []
+    diedit = 0
+    for key, message in items:
+        fp = fingerprint(message)
+        aksi = ledger.decide(key, fp)
+        if aksi == SEND:
+            kirim.append((key, fp, message))
+        elif aksi == EDIT:
+            edit.append((key, fp, message))
+
+    for key, fp, message in edit:
+        entry = ledger.get(key)
+        hasil = await dispatcher.edit_message_text(
+            bot, chat_id=entry['chat_id'], message_id=entry['message_id'],
+            **{k: v for k, v in message.items() if k != 'chat_id'}
+        )
+        if hasil is None:
+            # Pesan lama sudah tidak bisa diedit (terhapus/kadaluarsa) -> kirim baru
+            kirim.append((key, fp, message))
+        else:
+            ledger.record_edit(key, fp)
+            diedit += 1
+
+    terkirim = gagal = 0
+    if kirim:
+        laporan = await dispatcher.send_many(bot, [m for _, _, m in kirim])
+        for (key, fp, _), hasil in zip(kirim, laporan.results):
+            # None = gagal terkirim: tidak dicatat, dicoba lagi di jalan berikutnya
+            if hasil is not None:
+                ledger.record_sent(key, fp, hasil)
+                terkirim += 1
+        gagal = laporan.failed
+
+    jumlah_sebelum = len(ledger.entries)
+    ledger.prune(key for key, _ in items)
+    if kirim or edit or len(ledger.entries) != jumlah_sebelum:
+        ledger.save()
+    return terkirim, diedit, len(items) - len(kirim) - diedit, gagal
@@ -0,0 +1,286 @@
+import os
+import re
+import time
+import datetime
+import threading
+import functools
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from telegram.ext import ConversationHandler
+from telegram.request import HTTPXRequest
+import events
+
+# --- KONFIGURASI ---
+# Isi METRICS_PORT supaya /metrics dilayani server kecil di thread terpisah (0 = mati),
+# di mode polling maupun webhook. Tidak pernah ikut di port webhook publik; default
+# hanya loopback, buka ke jaringan lewat METRICS_LISTEN kalau scraper di host lain.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+
+_registry = []
+_lock = threading.Lock()   # dipakai dari event loop, thread pool Sheets & thread server metrics
+
+
+# --- METRIK (FORMAT TEKS PROMETHEUS) ---
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}   # tuple nilai label -> nilai
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(l, "")) for l in self.labels)
+
+    def _fmt(self, key, extra=()):
+        pasangan = list(zip(self.labels, key)) + list(extra)
+        if not pasangan:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pasangan) + "}"
+
+    def render(self):
+        baris = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = list(self._values.items())
+        baris += self._render_values(items)
+        return baris
+
+    def _render_values(self, items):
+        return [f"{self.name}{self._fmt(key)} {_num(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, batas in enumerate(self.buckets):
+                if value <= batas:
+                    data['buckets'][i] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    def _render_values(self, items):
+        baris = []
+        for key, data in items:
+            for batas, jumlah in zip(self.buckets, data['buckets']):
+                baris.append(f"{self.name}_bucket{self._fmt(key, [('le', _num(batas))])} {jumlah}")
+            baris.append(f"{self.name}_bucket{self._fmt(key, [('le', '+Inf')])} {data['count']}")
+            baris.append(f"{self.name}_sum{self._fmt(key)} {_num(data['sum'])}")
+            baris.append(f"{self.name}_count{self._fmt(key)} {data['count']}")
+        return baris
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    baris = []
+    for metric in _registry:
+        baris += metric.render()
+    return "\n".join(baris) + "\n"
+
+
+HANDLER_SECONDS = Histogram("telebot_handler_seconds", "Durasi handler update Telegram", ("handler",))
+HANDLER_ERRORS = Counter("telebot_handler_errors_total", "Handler yang berakhir dengan exception", ("handler",))
+JOB_SECONDS = Histogram("telebot_job_seconds", "Durasi job terjadwal", ("job",))
+JOB_ERRORS = Counter("telebot_job_errors_total", "Job yang berakhir dengan exception", ("job",))
+JOB_LAG_SECONDS = Histogram("telebot_job_lag_seconds", "Keterlambatan job dari jadwalnya", ("job",))
+JOB_LAST_LAG = Gauge("telebot_job_last_lag_seconds", "Keterlambatan eksekusi terakhir per job", ("job",))
+SHEETS_CALLS = Counter("telebot_sheets_calls_total", "Request ke Google Sheets/Drive API",
+                       ("method", "kind", "outcome"))
+SHEETS_SECONDS = Histogram("telebot_sheets_seconds", "Durasi request Google Sheets/Drive API", ("method",))
+TELEGRAM_CALLS = Counter("telebot_telegram_calls_total", "Request ke Telegram Bot API", ("method", "outcome"))
+TELEGRAM_SECONDS = Histogram("telebot_telegram_seconds", "Durasi request Telegram Bot API", ("method",))
+
+
+# --- GOOGLE SHEETS ---
+_VALUES_ACTIONS = {"batchGet", "batchUpdate", "batchClear", "append", "clear"}
+
+
+def sheets_operation(http_method, url):
+    # URL REST -> nama operasi yang stabil untuk label, misal "values.batchGet"
+    http_method = http_method.lower()
+    if "/drive/" in url:
+        return f"drive.files.{http_method}"
+    m = re.search(r"/spreadsheets/[^/:?]+([^?]*)", url)
+    rest = m.group(1) if m else ""
+    if rest.startswith("/values") or rest.startswith(":"):
+        action = rest.rsplit(":", 1)[-1] if ":" in rest else ""
+        if rest.startswith(":"):
+            return action
+        if action in _VALUES_ACTIONS:
+            return f"values.{action}"
+        return "values.get" if http_method == "get" else "values.update"
+    return f"spreadsheets.{http_method}"
+
+
+def record_sheets_call(http_method, url, outcome, seconds):
+    op = sheets_operation(http_method, url)
+    kind = "read" if http_method.lower() == "get" else "write"
+    SHEETS_CALLS.inc(method=op, kind=kind, outcome=outcome)
+    SHEETS_SECONDS.observe(seconds, method=op)
+
+
+# --- TELEGRAM ---
+class InstrumentedRequest(HTTPXRequest):
+    # Dipasang via ApplicationBuilder().request(InstrumentedRequest(...)):
+    # semua panggilan Bot API (termasuk reply_text, answer, pin) ikut terhitung
+    async def do_request(self, url, method, *args, **kwargs):
+        api = url.rsplit("/", 1)[-1]
+        mulai = time.perf_counter()
+        outcome = "error"
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+            outcome = str(code)
+        finally:
+            detik = time.perf_counter() - mulai
+            TELEGRAM_CALLS.inc(method=api, outcome=outcome)
+            TELEGRAM_SECONDS.observe(detik, method=api)
+            events.emit("telegram", method=api, outcome=outcome, ms=round(detik * 1000, 1))
+        return code, payload
+
+
+def telegram_request():
+    return InstrumentedRequest(connection_pool_size=256)
+
+
+# --- HANDLER & JOB ---
+def _timed(callback, histogram, errors, label, name):
+    if getattr(callback, "_metrics_wrapped", False):
+        return callback
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        nama = name(args) if callable(name) else name
+        # Semua event di dalam handler/job (Sheets, Telegram) membawa update_id / nama job ini
+        if label == "handler":
+            konteks = {"update_id": getattr(args[0], "update_id", None) if args else None}
+        else:
+            konteks = {"job": nama}
+        with events.bind(**konteks):
+            mulai = time.perf_counter()
+            outcome = "ok"
+            try:
+                return await callback(*args, **kwargs)
+            except Exception as e:
+                errors.inc(**{label: nama})
+                outcome = type(e).__name__
+                raise
+            finally:
+                detik = time.perf_counter() - mulai
+                histogram.observe(detik, **{label: nama})
+                events.emit("update" if label == "handler" else "job", **{label: nama},
+                            outcome=outcome, ms=round(detik * 1000, 1))
+    wrapper._metrics_wrapped = True
+    return wrapper
+
+
+def _handlers(handler):
+    if isinstance(handler, ConversationHandler):
+        for h in handler.entry_points + handler.fallbacks:
+            yield from _handlers(h)
+        for state_handlers in handler.states.values():
+            for h in state_handlers:
+                yield from _handlers(h)
+    elif hasattr(handler, "callback"):
+        yield handler
+
+
+def _job_name(fallback):
+    def name(args):
+        job = getattr(args[0], "job", None) if args else None
+        return getattr(job, "name", None) or fallback
+    return name
+
+
+def instrument(application):
+    # Panggil setelah semua handler & job didaftarkan (sebelum webhook.run)
+    for group in application.handlers.values():
+        for handler in group:
+            for h in _handlers(handler):
+                h.callback = _timed(h.callback, HANDLER_SECONDS, HANDLER_ERRORS, "handler", h.callback.__name__)
+    job_queue = application.job_queue
+    if job_queue is None:
+        return
+    for job in job_queue.jobs():
+        job.callback = _timed(job.callback, JOB_SECONDS, JOB_ERRORS, "job", _job_name(job.callback.__name__))
+    watch_job_lag(job_queue)
+
+
+def watch_job_lag(job_queue):
+    # APScheduler memberi tahu jadwal seharusnya saat job diserahkan ke executor
+    from apscheduler.events import EVENT_JOB_SUBMITTED
+    scheduler = job_queue.scheduler
+
+    def listener(event):
+        job = scheduler.get_job(event.job_id)
+        nama = job.name if job is not None else event.job_id
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for jadwal in event.scheduled_run_times:
+            lag = max(0.0, (now - jadwal).total_seconds())
+            JOB_LAG_SECONDS.observe(lag, job=nama)
+            JOB_LAST_LAG.set(lag, job=nama)
+
+    scheduler.add_listener(listener, EVENT_JOB_SUBMITTED)
+
+
+# --- ENDPOINT /metrics ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=METRICS_PORT, listen=METRICS_LISTEN):
+    server = ThreadingHTTPServer((listen, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Endpoint metrics aktif di {listen}:{port}/metrics")
+    return server
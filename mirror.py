@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+# --- KONFIGURASI ---
+# Salinan lokal PIC_LIST, tab tugas, dan Form Responses. Sheets tetap sumber
+# kebenaran; file ini hanya supaya baca data tidak menunggu Google.
+MIRROR_DB = os.getenv("MIRROR_DB", "mirror.db")
+MIRROR_SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL", "60"))
+
+logger = logging.getLogger(__name__)
+
+_shared = {}   # path -> Mirror
+_shared_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY, row INTEGER, status TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+
+CREATE TABLE IF NOT EXISTS pic (
+    witel TEXT PRIMARY KEY, row INTEGER, username TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pic_username ON pic(username);
+
+CREATE TABLE IF NOT EXISTS responses (row INTEGER PRIMARY KEY, data TEXT);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    tanggal TEXT, witel TEXT, waktu TEXT, PRIMARY KEY (tanggal, witel)
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_witel ON submissions(witel, tanggal);
+
+CREATE TABLE IF NOT EXISTS daily_agg (
+    tanggal TEXT, witel TEXT, wajib INTEGER, menit INTEGER, PRIMARY KEY (tanggal, witel)
+);
+
+CREATE TABLE IF NOT EXISTS daily_summary (
+    tanggal TEXT, witel TEXT, jumlah INTEGER, pertama TEXT, terakhir TEXT, PRIMARY KEY (tanggal, witel)
+);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    sheet TEXT, key TEXT, value TEXT, created_at REAL, PRIMARY KEY (sheet, key)
+);
+"""
+
+
+def get_mirror(path=MIRROR_DB):
+    # Satu mirror per file per proses, dipakai bersama bot & admin (tiap tenant punya file sendiri)
+    with _shared_lock:
+        if path not in _shared:
+            _shared[path] = Mirror(path)
+        return _shared[path]
+
+
+# --- MIRROR SQLITE ---
+class Mirror:
+    def __init__(self, path=MIRROR_DB):
+        self.path = path
+        # Dipakai dari event loop dan thread pool Sheets -> satu koneksi + lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _exec(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _execmany(self, statements):
+        # statements: list of (sql, params) dalam satu transaksi
+        with self._lock, self._conn:
+            for sql, params in statements:
+                if isinstance(params, list):
+                    self._conn.executemany(sql, params)
+                else:
+                    self._conn.execute(sql, params)
+
+    # --- META ---
+    def get_meta(self, key, default=None):
+        rows = self._exec("SELECT value FROM meta WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def _meta_stmt(self, key, value):
+        return ("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def synced_at(self, table):
+        # time.time() sinkronisasi terakhir, atau None kalau belum pernah
+        return self.get_meta(f"synced_at:{table}")
+
+    def mark_synced(self, table):
+        # Sinkronisasi berhasil walau tidak ada data baru (dipakai analytics untuk menutup hari)
+        self._execmany([self._meta_stmt(f"synced_at:{table}", time.time())])
+
+    # --- TAB TUGAS ---
+    def replace_tasks(self, records):
+        self._execmany([
+            ("DELETE FROM tasks", ()),
+            ("INSERT OR REPLACE INTO tasks (id, row, status, data) VALUES (?, ?, ?, ?)", [
+                (str(r.get('id')), i, str(r.get('status')), json.dumps(r))
+                for i, r in enumerate(records, 2) if str(r.get('id'))
+            ]),
+            self._meta_stmt("synced_at:tasks", time.time()),
+        ])
+
+    def tasks(self, status=None):
+        if status is None:
+            rows = self._exec("SELECT data, status FROM tasks ORDER BY row")
+        else:
+            rows = self._exec("SELECT data, status FROM tasks WHERE lower(status) = ? ORDER BY row", (status.lower(),))
+        return [dict(json.loads(data), status=status) for data, status in rows]
+
+    def task(self, task_id):
+        rows = self._exec("SELECT data, status FROM tasks WHERE id = ?", (str(task_id),))
+        return dict(json.loads(rows[0][0]), status=rows[0][1]) if rows else None
+
+    def task_rows(self):
+        return dict(self._exec("SELECT id, row FROM tasks"))
+
+    def queue_task_status(self, task_id, status):
+        # Klik "Sudah Submit": status lokal + outbox dalam satu transaksi (satu commit)
+        self._execmany([
+            ("UPDATE tasks SET status = ? WHERE id = ?", (status, str(task_id))),
+            ("INSERT OR REPLACE INTO outbox (sheet, key, value, created_at) VALUES (?, ?, ?, ?)",
+             ("tasks", str(task_id), status, time.time())),
+        ])
+
+    # --- PIC_LIST ---
+    def replace_pic(self, records):
+        self._execmany([
+            ("DELETE FROM pic", ()),
+            ("INSERT OR REPLACE INTO pic (witel, row, username, data) VALUES (?, ?, ?, ?)", [
+                (str(r.get('Witel')).strip(), i, str(r.get('Username', '')).strip(), json.dumps(r))
+                for i, r in enumerate(records, 2) if str(r.get('Witel', '')).strip()
+            ]),
+            self._meta_stmt("synced_at:pic", time.time()),
+        ])
+
+    def pic_list(self):
+        rows = self._exec("SELECT data, username FROM pic ORDER BY row")
+        return [dict(json.loads(data), Username=username) for data, username in rows]
+
+    def pic_row(self, witel):
+        rows = self._exec("SELECT row FROM pic WHERE witel = ?", (str(witel).strip(),))
+        return rows[0][0] if rows else None
+
+    def set_pic_username(self, witel, username):
+        self._exec("UPDATE pic SET username = ? WHERE witel = ?", (username, str(witel).strip()))
+
+    def set_pic_usernames(self, pairs):
+        # pairs: list of (witel, username), satu transaksi
+        self._execmany([
+            ("UPDATE pic SET username = ? WHERE witel = ?", [(u, str(w).strip()) for w, u in pairs]),
+        ])
+
+    # --- FORM RESPONSES ---
+    def load_responses(self):
+        # -> (header, rows) atau (None, []) kalau mirror masih kosong
+        header = self.get_meta("responses_header")
+        rows = [json.loads(data) for (data,) in self._exec("SELECT data FROM responses ORDER BY row")]
+        return header, rows
+
+    def save_responses(self, header, rows, first_row, reset=False):
+        statements = []
+        if reset:
+            statements.append(("DELETE FROM responses", ()))
+        statements.append((
+            "INSERT OR REPLACE INTO responses (row, data) VALUES (?, ?)",
+            [(i, json.dumps(r)) for i, r in enumerate(rows, first_row)],
+        ))
+        statements.append(self._meta_stmt("responses_header", header))
+        statements.append(self._meta_stmt("synced_at:responses", time.time()))
+        self._execmany(statements)
+
+    def save_submissions(self, items, reset=False, keep_before=None):
+        # items: list of (tanggal iso, witel, waktu iso)
+        # reset + keep_before: riwayat sebelum tanggal itu (sudah diarsip dari sheet) tidak dihapus
+        statements = []
+        if reset and keep_before:
+            statements.append(("DELETE FROM submissions WHERE tanggal >= ?", (keep_before,)))
+        elif reset:
+            statements.append(("DELETE FROM submissions", ()))
+        statements.append((
+            "INSERT OR IGNORE INTO submissions (tanggal, witel, waktu) VALUES (?, ?, ?)", list(items)
+        ))
+        self._execmany(statements)
+
+    def submissions_on(self, tanggal):
+        return dict(self._exec("SELECT witel, waktu FROM submissions WHERE tanggal = ?", (tanggal.isoformat(),)))
+
+    def first_submission_date(self):
+        rows = self._exec("SELECT MIN(tanggal) FROM submissions")
+        return rows[0][0] if rows else None
+
+    def submissions_between(self, awal, akhir):
+        # Tanggal iso, inklusif
+        return self._exec(
+            "SELECT tanggal, witel, waktu FROM submissions WHERE tanggal BETWEEN ? AND ? ORDER BY tanggal",
+            (awal, akhir),
+        )
+
+    # --- AGREGAT HARIAN (analytics.py) ---
+    def daily_agg(self):
+        return self._exec("SELECT tanggal, witel, wajib, menit FROM daily_agg ORDER BY tanggal")
+
+    def save_daily_agg(self, items, until):
+        # items: list of (tanggal iso, witel, wajib 0/1, menit atau None)
+        self._execmany([
+            ("INSERT OR REPLACE INTO daily_agg (tanggal, witel, wajib, menit) VALUES (?, ?, ?, ?)", list(items)),
+            self._meta_stmt("analytics_until", until),
+        ])
+
+    # --- RINGKASAN HARIAN RESPONS YANG SUDAH DIARSIP (archive.py) ---
+    def save_daily_summary(self, items):
+        # items: list of (tanggal iso, witel, jumlah, pertama iso, terakhir iso).
+        # Tanggalnya dicatat sebagai "belum masuk tab ringkasan" di transaksi yang sama.
+        pending = sorted(set(self.summary_pending()) | {item[0] for item in items})
+        self._execmany([
+            ("INSERT OR REPLACE INTO daily_summary (tanggal, witel, jumlah, pertama, terakhir) VALUES (?, ?, ?, ?, ?)",
+             list(items)),
+            self._meta_stmt("summary_pending", pending),
+        ])
+
+    def summary_pending(self):
+        return self.get_meta("summary_pending", [])
+
+    def clear_summary_pending(self, tanggal):
+        sisa = [t for t in self.summary_pending() if t not in set(tanggal)]
+        self._execmany([self._meta_stmt("summary_pending", sisa)])
+
+    def daily_summary_between(self, tanggal):
+        # tanggal: list tanggal iso -> list of (tanggal, witel, jumlah, pertama, terakhir)
+        if not tanggal:
+            return []
+        tanda = ",".join("?" * len(tanggal))
+        return self._exec(
+            f"SELECT tanggal, witel, jumlah, pertama, terakhir FROM daily_summary WHERE tanggal IN ({tanda}) "
+            "ORDER BY tanggal, witel",
+            tuple(tanggal),
+        )
+
+    def daily_summary_on(self, tanggal):
+        return self._exec(
+            "SELECT witel, jumlah, pertama, terakhir FROM daily_summary WHERE tanggal = ? ORDER BY witel",
+            (tanggal.isoformat(),),
+        )
+
+    # --- OUTBOX (TULISAN YANG BELUM TERKIRIM KE SHEETS) ---
+    def outbox_put(self, sheet, key, value):
+        self._exec(
+            "INSERT OR REPLACE INTO outbox (sheet, key, value, created_at) VALUES (?, ?, ?, ?)",
+            (sheet, str(key), value, time.time()),
+        )
+
+    def outbox_remove(self, sheet, key, value):
+        # Hanya hapus kalau nilainya masih sama (tidak ada tulisan lebih baru)
+        self._exec("DELETE FROM outbox WHERE sheet = ? AND key = ? AND value = ?", (sheet, str(key), value))
+
+    def outbox_remove_many(self, sheet, items):
+        # items: list of (key, value) yang sudah terkirim, satu transaksi per flush
+        self._execmany([
+            ("DELETE FROM outbox WHERE sheet = ? AND key = ? AND value = ?",
+             [(sheet, str(key), value) for key, value in items]),
+        ])
+
+    def outbox(self, sheet):
+        return dict(self._exec("SELECT key, value FROM outbox WHERE sheet = ? ORDER BY created_at", (sheet,)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
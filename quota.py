@@ -0,0 +1,241 @@
+import os
+import time
+import asyncio
+import random
+import threading
+import functools
+import contextlib
+import contextvars
+import logging
+from gspread.exceptions import APIError
+import metrics
+import events
+
+# --- KONFIGURASI ---
+# Kuota Sheets API per menit (default = batas per user Google). Baca & tulis dihitung terpisah.
+SHEETS_READ_PER_MINUTE = float(os.getenv("SHEETS_READ_PER_MINUTE", "60"))
+SHEETS_WRITE_PER_MINUTE = float(os.getenv("SHEETS_WRITE_PER_MINUTE", "60"))
+# Porsi budget yang hanya boleh dipakai lane interaktif (klik & command)
+SHEETS_INTERACTIVE_RESERVE = float(os.getenv("SHEETS_INTERACTIVE_RESERVE", "0.2"))
+# Retry 429/5xx dengan exponential backoff + jitter
+SHEETS_MAX_RETRY = int(os.getenv("SHEETS_MAX_RETRY", "5"))
+SHEETS_BACKOFF_BASE = float(os.getenv("SHEETS_BACKOFF_BASE", "1"))
+SHEETS_BACKOFF_MAX = float(os.getenv("SHEETS_BACKOFF_MAX", "32"))
+# Batas menunggu budget sebelum menyerah (detik)
+SHEETS_QUOTA_WAIT = float(os.getenv("SHEETS_QUOTA_WAIT", "30"))
+# Sisa waktu yang disisakan untuk request terakhir sebelum sheets.run menyerah (detik)
+SHEETS_DEADLINE_MARGIN = float(os.getenv("SHEETS_DEADLINE_MARGIN", "3"))
+
+INTERACTIVE, BACKGROUND = "interactive", "background"
+
+logger = logging.getLogger(__name__)
+
+_lane = contextvars.ContextVar("sheets_lane", default=INTERACTIVE)
+# Batas waktu (time.monotonic) pemanggil sheets.run; tunggu budget + retry tidak boleh melewatinya
+_deadline = contextvars.ContextVar("sheets_deadline", default=None)
+
+BUDGET_REMAINING = metrics.Gauge("telebot_sheets_budget_remaining", "Sisa budget Sheets per menit", ("kind",))
+WAITING = metrics.Gauge("telebot_sheets_waiting", "Panggilan Sheets yang menunggu budget", ("lane",))
+RETRIES = metrics.Counter("telebot_sheets_retries_total", "Retry panggilan Sheets setelah 429/5xx", ("outcome",))
+
+
+class QuotaTimeout(Exception):
+    pass
+
+
+# --- LANE PRIORITAS ---
+# Default interaktif (handler update). Job terjadwal & refresh background
+# dijalankan di lane BACKGROUND dan mengalah ke klik user.
+def current_lane():
+    return _lane.get()
+
+
+@contextlib.contextmanager
+def lane(name):
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def background(callback):
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        with lane(BACKGROUND):
+            return await callback(*args, **kwargs)
+    wrapper._quota_background = True
+    return wrapper
+
+
+def install(application):
+    # Semua job yang terdaftar -> lane background (dipanggil dari webhook.run)
+    job_queue = application.job_queue
+    if job_queue is None:
+        return
+    for job in job_queue.jobs():
+        if not getattr(job.callback, "_quota_background", False):
+            job.callback = background(job.callback)
+
+
+# --- BATAS WAKTU ---
+def set_deadline(seconds):
+    # Dipanggil sheets.run di context thread pool: timeout await dikurangi margin
+    _deadline.set(time.monotonic() + max(0.0, seconds - SHEETS_DEADLINE_MARGIN))
+
+
+def remaining():
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+# --- GOVERNOR ---
+class Budget:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class Governor:
+    def __init__(self, read=SHEETS_READ_PER_MINUTE, write=SHEETS_WRITE_PER_MINUTE,
+                 reserve=SHEETS_INTERACTIVE_RESERVE):
+        self.budgets = {"read": Budget(read), "write": Budget(write)}
+        self.reserve = reserve
+        self.paused_until = 0.0
+        self._waiting = {(k, l): 0 for k in self.budgets for l in (INTERACTIVE, BACKGROUND)}
+        self._cond = threading.Condition()
+
+    def acquire(self, kind, lane=INTERACTIVE, timeout=SHEETS_QUOTA_WAIT):
+        # Blocking (dipanggil dari thread pool Sheets) sampai ada budget untuk satu request
+        budget = self.budgets[kind]
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting[(kind, lane)] += 1
+            self._publish()
+            try:
+                while True:
+                    now = time.monotonic()
+                    budget.refill(now)
+                    wait = self.paused_until - now
+                    if wait <= 0:
+                        if lane == INTERACTIVE:
+                            floor = 1
+                        else:
+                            # Background tidak boleh menyentuh cadangan interaktif,
+                            # dan mengalah selama ada klik yang sedang menunggu
+                            floor = 1 + budget.capacity * self.reserve
+                        mengalah = lane == BACKGROUND and self._waiting[(kind, INTERACTIVE)] > 0
+                        if budget.tokens >= floor and not mengalah:
+                            budget.tokens -= 1
+                            return
+                        wait = (floor - budget.tokens) / budget.rate if budget.tokens < floor else 0.05
+                    if now + wait > deadline:
+                        raise QuotaTimeout(f"Budget Sheets ({kind}) habis, menunggu lebih dari {timeout:.0f} detik")
+                    self._cond.wait(timeout=max(wait, 0.01))
+            finally:
+                self._waiting[(kind, lane)] -= 1
+                self._publish()
+                self._cond.notify_all()
+
+    def pause(self, seconds):
+        # 429 = kuota project/user habis -> semua pemanggil ikut menunggu
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def status(self):
+        with self._cond:
+            now = time.monotonic()
+            for budget in self.budgets.values():
+                budget.refill(now)
+            return {
+                'read_remaining': int(self.budgets['read'].tokens),
+                'read_per_minute': int(self.budgets['read'].capacity),
+                'write_remaining': int(self.budgets['write'].tokens),
+                'write_per_minute': int(self.budgets['write'].capacity),
+                'waiting': {f"{k}/{l}": n for (k, l), n in self._waiting.items() if n},
+                'paused_for': max(0.0, round(self.paused_until - now, 1)),
+            }
+
+    def _publish(self):
+        for kind, budget in self.budgets.items():
+            BUDGET_REMAINING.set(round(budget.tokens, 1), kind=kind)
+        for l in (INTERACTIVE, BACKGROUND):
+            WAITING.set(sum(n for (k, ln), n in self._waiting.items() if ln == l), lane=l)
+
+
+governor = Governor()
+
+
+# --- BACKOFF ---
+def status_code(error):
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_retryable(error):
+    code = status_code(error)
+    return code == 429 or (code is not None and 500 <= code < 600)
+
+
+def is_quota_error(error):
+    # Timeout sheets.run juga dianggap "Sheets sibuk" (kuota habis / retry belum selesai)
+    if isinstance(error, (QuotaTimeout, asyncio.TimeoutError, TimeoutError)):
+        return True
+    return isinstance(error, APIError) and status_code(error) == 429
+
+
+def backoff_delay(attempt, error=None):
+    # Full jitter: acak 0..min(max, base * 2^attempt), minimal Retry-After kalau ada
+    delay = random.uniform(0, min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** attempt))
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        delay = max(delay, float(headers.get("Retry-After", 0)))
+    except (TypeError, ValueError):
+        pass
+    return delay
+
+
+def call(request, method, endpoint, *args, **kwargs):
+    # Satu request REST gspread lewat governor: tunggu budget, retry 429/5xx
+    kind = "read" if method.lower() == "get" else "write"
+    lane_now = current_lane()
+    for attempt in range(SHEETS_MAX_RETRY + 1):
+        # Jangan menunggu/mengirim lagi kalau pemanggil (sheets.run) sudah hampir menyerah:
+        # request yang terlambat bisa tetap menulis setelah user diberi tahu gagal
+        sisa = remaining()
+        if sisa is not None and sisa <= 0:
+            raise QuotaTimeout("Batas waktu panggilan Sheets habis sebelum request dikirim")
+        governor.acquire(kind, lane_now, timeout=SHEETS_QUOTA_WAIT if sisa is None else min(SHEETS_QUOTA_WAIT, sisa))
+        mulai = time.perf_counter()
+        outcome = "ok"
+        try:
+            return request(method, endpoint, *args, **kwargs)
+        except APIError as e:
+            outcome = str(status_code(e) or "error")
+            delay = backoff_delay(attempt, e) if is_retryable(e) else 0
+            sisa = remaining()
+            melewati_batas = sisa is not None and delay >= sisa
+            if not is_retryable(e) or attempt == SHEETS_MAX_RETRY or melewati_batas:
+                if is_retryable(e):
+                    RETRIES.inc(outcome="gave_up")
+                raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            detik = time.perf_counter() - mulai
+            metrics.record_sheets_call(method, endpoint, outcome, detik)
+            events.emit("sheets", method=metrics.sheets_operation(method, endpoint), lane=lane_now,
+                        attempt=attempt, outcome=outcome, ms=round(detik * 1000, 1))
+
+        RETRIES.inc(outcome=outcome)
+        if outcome == "429":
+            governor.pause(delay)
+        logger.warning(f"Sheets {outcome} ({lane_now}), retry ke-{attempt + 1} dalam {delay:.1f} detik.")
+        time.sleep(delay)
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import aiohttp
+from dotenv import load_dotenv
+
+# Harness lokal: kirim ulang update Telegram yang sudah direkam ke webhook bot.
+# File berisi satu update JSON per baris (atau satu list JSON).
+#
+#   python replay_updates.py rekaman.jsonl --url http://localhost:8080/telegram
+load_dotenv()
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def baca_updates(path):
+    with open(path, encoding="utf-8") as f:
+        isi = f.read().strip()
+    if isi.startswith("["):
+        return json.loads(isi)
+    return [json.loads(baris) for baris in isi.splitlines() if baris.strip()]
+
+
+async def kirim(session, url, secret, update, hasil):
+    headers = {SECRET_HEADER: secret} if secret else {}
+    mulai = time.perf_counter()
+    async with session.post(url, json=update, headers=headers) as resp:
+        hasil.append((update.get("update_id"), resp.status, time.perf_counter() - mulai))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay update Telegram ke webhook lokal")
+    parser.add_argument("file")
+    parser.add_argument("--url", default=f"http://localhost:{os.getenv('WEBHOOK_PORT', '8080')}{os.getenv('WEBHOOK_PATH', '/telegram')}")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET", ""))
+    parser.add_argument("--concurrency", type=int, default=1, help="jumlah POST paralel")
+    args = parser.parse_args()
+
+    updates = baca_updates(args.file)
+    hasil = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def satu(update):
+            async with semaphore:
+                await kirim(session, args.url, args.secret, update, hasil)
+        await asyncio.gather(*(satu(u) for u in updates))
+
+    gagal = [h for h in hasil if h[1] != 200]
+    waktu = sorted(h[2] for h in hasil)
+    for update_id, status, detik in hasil:
+        print(f"update {update_id}: HTTP {status} ({detik * 1000:.1f} ms)")
+    if waktu:
+        print(f"\n{len(hasil)} update, {len(gagal)} gagal, "
+              f"median {waktu[len(waktu) // 2] * 1000:.1f} ms, maks {waktu[-1] * 1000:.1f} ms")
+    return 1 if gagal else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
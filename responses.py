@@ -0,0 +1,192 @@
+import re
+import asyncio
+import datetime
+import logging
+from gspread.exceptions import APIError
+from gspread.utils import rowcol_to_a1
+import sheets
+
+logger = logging.getLogger(__name__)
+
+
+# --- INGESTI INKREMENTAL "Form Responses 1" ---
+# Tab jawaban Google Form sifatnya append-only, jadi cukup ambil baris baru
+# setelah baris terakhir yang sudah dibaca. Full resync hanya kalau header
+# berubah atau sheet menyusut (baris dihapus/diurutkan ulang).
+class ResponseLog:
+    def __init__(self, get_sheet, mirror=None):
+        self.get_sheet = get_sheet   # fungsi yang mengembalikan worksheet jawaban form
+        self.mirror = mirror
+        self.header = None
+        self.rows = []               # semua baris data (tanpa header)
+        self.generation = 0          # naik setiap full resync
+        self._lock = asyncio.Lock()
+        if mirror is not None:
+            self._load_from_mirror()
+
+    def _load_from_mirror(self):
+        # Lanjut dari salinan lokal: setelah restart tidak perlu full resync
+        header, rows = self.mirror.load_responses()
+        if header is not None:
+            self.header, self.rows = header, rows
+            self.generation += 1
+            logger.info(f"Form Responses dimuat dari mirror lokal ({len(rows)} baris).")
+
+    @property
+    def last_row(self):
+        # Nomor baris terakhir yang sudah dibaca (header = baris 1)
+        return len(self.rows) + 1
+
+    async def sync(self):
+        # Mengembalikan daftar baris baru sejak sync sebelumnya
+        async with self._lock:
+            return await sheets.run(self._sync_blocking)
+
+    def _sync_blocking(self):
+        ws = self.get_sheet()
+        if self.header is None:
+            return self._full_resync(ws)
+
+        last_col = re.sub(r"\d", "", rowcol_to_a1(1, max(len(self.header), 1)))
+        last = self.last_row
+        try:
+            # Satu request: header + baris terakhir yang sudah dikenal + semua baris baru
+            header, tail = ws.batch_get(["1:1", f"A{last}:{last_col}"])
+        except APIError:
+            # Misal baris terakhir sudah di luar grid karena sheet dipotong
+            return self._full_resync(ws)
+        header = list(header[0]) if header else []
+        tail = [list(r) for r in tail]
+
+        if _strip(header) != _strip(self.header):
+            logger.info("Header Form Responses berubah, full resync.")
+            return self._full_resync(ws)
+        expected_last = self.rows[-1] if self.rows else self.header
+        if not tail or _strip(tail[0]) != _strip(expected_last):
+            logger.info("Form Responses menyusut/berubah urutan, full resync.")
+            return self._full_resync(ws)
+
+        new_rows = tail[1:]
+        if new_rows and self.mirror is not None:
+            self.mirror.save_responses(self.header, new_rows, first_row=self.last_row + 1)
+        elif self.mirror is not None:
+            self.mirror.mark_synced("responses")
+        self.rows.extend(new_rows)
+        return new_rows
+
+    async def archive_head(self, select, store):
+        # Pindahkan baris terlama keluar dari sheet (lihat archive.py).
+        # select(rows) -> jumlah baris teratas yang diarsip, store(header, rows)
+        # dipanggil sebelum baris dihapus. Hasil: baris yang sudah dihapus.
+        async with self._lock:
+            return await sheets.run(self._archive_head_blocking, select, store)
+
+    def _archive_head_blocking(self, select, store):
+        n = select(self.rows) if self.header is not None else 0
+        if not n:
+            return []
+        ws = self.get_sheet()
+        last_col = re.sub(r"\d", "", rowcol_to_a1(1, max(len(self.header), 1)))
+        # Pastikan isi sheet masih sama dengan salinan lokal sebelum menghapus
+        header, pertama, terakhir = ws.batch_get(["1:1", f"A2:{last_col}2", f"A{n + 1}:{last_col}{n + 1}"])
+        cocok = (
+            _strip(header[0] if header else []) == _strip(self.header)
+            and _strip(pertama[0] if pertama else []) == _strip(self.rows[0])
+            and _strip(terakhir[0] if terakhir else []) == _strip(self.rows[n - 1])
+        )
+        if not cocok:
+            logger.warning("Form Responses berubah sejak sinkronisasi terakhir, arsip ditunda.")
+            return []
+
+        arsip = self.rows[:n]
+        store(self.header, arsip)
+        # Satu request batchUpdate; baris baru dari form selalu di bawah, tidak ikut bergeser
+        ws.delete_rows(2, n + 1)
+        self.rows = self.rows[n:]
+        if self.mirror is not None:
+            self.mirror.save_responses(self.header, self.rows, first_row=2, reset=True)
+        logger.info(f"{n} baris Form Responses dipindah ke arsip.")
+        return arsip
+
+    def _full_resync(self, ws):
+        all_values = ws.get_all_values()
+        self.header = all_values[0] if all_values else []
+        self.rows = all_values[1:]
+        self.generation += 1
+        if self.mirror is not None:
+            self.mirror.save_responses(self.header, self.rows, first_row=2, reset=True)
+        logger.info(f"Form Responses dimuat penuh ({len(self.rows)} baris).")
+        return self.rows
+
+
+# --- INDEX SUBMISSION PER HARI ---
+# tanggal -> {witel: waktu submit pertama}. Timestamp diparse SEKALI saat baris
+# masuk, jadi cek status hari apa pun cukup lookup dict/set.
+TIMESTAMP_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+
+class SubmissionIndex:
+    def __init__(self, tz, ts_col=1, witel_col=5, mirror=None):
+        self.tz = tz
+        self.mirror = mirror
+        self.ts_col = ts_col         # Kolom ke-2 = timestamp
+        self.witel_col = witel_col   # Kolom ke-6 = nama Witel
+        self.by_date = {}
+        self._generation = None
+
+    def update(self, log, new_rows):
+        # Kalau log baru saja full resync, index dibangun ulang dari awal
+        reset = log.generation != self._generation
+        if reset:
+            self.by_date = {}
+            self._generation = log.generation
+            new_rows = log.rows
+        self.add_rows(new_rows, reset=reset)
+
+    def add_rows(self, rows, reset=False):
+        baru = []
+        for row in rows:
+            try:
+                waktu = parse_timestamp(row[self.ts_col], self.tz)
+                witel = str(row[self.witel_col]).strip()
+            except IndexError:
+                continue
+            if waktu is None or not witel:
+                continue
+            per_witel = self.by_date.setdefault(waktu.date(), {})
+            if witel not in per_witel or waktu < per_witel[witel]:
+                per_witel[witel] = waktu
+                baru.append((waktu.date().isoformat(), witel, waktu.isoformat()))
+        if self.mirror is not None and baru:
+            # Hari sebelum baris pertama di sheet sudah diarsip (archive.py) -> riwayatnya dipertahankan.
+            # Full resync tanpa baris data (sheet dikosongkan / semua sudah diarsip) tidak menghapus apa pun.
+            keep_before = min(tanggal for tanggal, _, _ in baru) if reset else None
+            self.mirror.save_submissions(baru, reset=reset, keep_before=keep_before)
+
+    def witel_on(self, tanggal):
+        # dict witel -> waktu submit (bisa dipakai sebagai set)
+        return self.by_date.get(tanggal, {})
+
+    def submitted(self, witel, tanggal):
+        return witel in self.witel_on(tanggal)
+
+    def submitted_at(self, witel, tanggal):
+        return self.witel_on(tanggal).get(witel)
+
+
+def parse_timestamp(value, tz):
+    value = str(value).strip()
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return tz.localize(datetime.datetime.strptime(value, fmt))
+        except ValueError:
+            continue
+    return None
+
+
+def _strip(row):
+    # Abaikan sel kosong di ujung kanan (get_all_values vs batch_get beda padding)
+    row = [str(v) for v in row]
+    while row and row[-1] == "":
+        row.pop()
+    return row
@@ -0,0 +1,173 @@
+import os
+import asyncio
+import functools
+import contextvars
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+import quota
+
+# --- KONFIGURASI ---
+# Kredensial & client dibuat SEKALI per proses, lalu dipakai ulang oleh
+# bot.py, admin.py, bot_update.py (dan test_bot.py).
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# Pool thread terbatas untuk semua I/O Sheets (gspread bersifat blocking)
+SHEETS_WORKERS = int(os.getenv("SHEETS_WORKERS", "4"))
+SHEETS_TIMEOUT = float(os.getenv("SHEETS_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_creds = None
+_client = None
+_spreadsheets = {}   # ("key", id) / ("title", nama) -> gspread.Spreadsheet
+_worksheets = {}     # (spreadsheet_ref, nama_tab) -> gspread.Worksheet
+_executor = None
+_background_slots = None
+
+
+# --- KONEKSI (SHARED & POOLED) ---
+def get_client():
+    global _creds, _client
+    with _lock:
+        if _client is None:
+            keyfile = os.getenv("SERVICE_ACCOUNT_FILE", "service_account.json")
+            _creds = ServiceAccountCredentials.from_json_keyfile_name(keyfile, SCOPE)
+            _client = gspread.authorize(_creds)
+            _instrument(_client)
+            logger.info("Google Sheets client terhubung.")
+        elif getattr(_creds, "access_token_expired", False) and hasattr(_client, "login"):
+            # gspread lama (oauth2client) tidak refresh otomatis -> login ulang
+            # hanya saat token sudah kadaluarsa. Session HTTP tetap dipakai ulang.
+            _client.login()
+            logger.info("Token Google Sheets diperbarui.")
+        return _client
+
+
+def _instrument(client):
+    # Semua request REST gspread lewat satu method -> governor kuota (quota.py):
+    # budget baca/tulis per menit, lane prioritas, retry 429/5xx, metrik per operasi
+    target = getattr(client, "http_client", client)   # gspread 6 / gspread lama
+    target.request = functools.partial(quota.call, target.request)
+
+
+def _resolve(key=None, title=None):
+    # Prioritas: key eksplisit -> title eksplisit -> SPREADSHEET_ID -> SPREADSHEET_NAME
+    if key:
+        return ("key", key)
+    if title:
+        return ("title", title)
+    if os.getenv("SPREADSHEET_ID"):
+        return ("key", os.getenv("SPREADSHEET_ID"))
+    if os.getenv("SPREADSHEET_NAME"):
+        return ("title", os.getenv("SPREADSHEET_NAME"))
+    raise RuntimeError("SPREADSHEET_ID / SPREADSHEET_NAME belum diisi di .env")
+
+
+def open_spreadsheet(key=None, title=None):
+    ref = _resolve(key, title)
+    client = get_client()
+    with _lock:
+        ss = _spreadsheets.get(ref)
+        if ss is None:
+            ss = client.open_by_key(ref[1]) if ref[0] == "key" else client.open(ref[1])
+            _spreadsheets[ref] = ss
+        return ss
+
+
+def get_worksheet(name=None, key=None, title=None):
+    # name=None -> tab pertama (sama seperti .sheet1)
+    ref = _resolve(key, title)
+    get_client()  # cek token kadaluarsa walau handle sudah ada di cache
+    with _lock:
+        ws = _worksheets.get((ref, name))
+        if ws is None:
+            ss = open_spreadsheet(**{ref[0]: ref[1]})
+            ws = ss.worksheet(name) if name else ss.sheet1
+            _worksheets[(ref, name)] = ws
+        return ws
+
+
+# --- GATEWAY ASYNC (JALANKAN DI LUAR EVENT LOOP) ---
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SHEETS_WORKERS, thread_name_prefix="sheets")
+        return _executor
+
+
+def _get_background_slots():
+    # Lane background maksimal memakai SHEETS_WORKERS - 1 thread,
+    # jadi selalu ada thread kosong untuk klik/command user
+    global _background_slots
+    if _background_slots is None:
+        _background_slots = asyncio.Semaphore(max(1, SHEETS_WORKERS - 1))
+    return _background_slots
+
+
+async def run(fn, *args, timeout=None, **kwargs):
+    # Contoh: records = await sheets.run(sh.get_all_records)
+    # Event loop tetap melayani user lain selama menunggu Google.
+    slots = _get_background_slots() if quota.current_lane() == quota.BACKGROUND else None
+    if slots is not None:
+        await slots.acquire()
+    return await _submit(fn, args, kwargs, timeout, slots)
+
+
+async def _submit(fn, args, kwargs, timeout, slots=None):
+    timeout = timeout or SHEETS_TIMEOUT
+    # Context (lane prioritas, update_id) ikut dibawa ke thread pool, plus batas waktu
+    # untuk governor: tunggu kuota + retry selesai sebelum await di bawah menyerah
+    ctx = contextvars.copy_context()
+    ctx.run(quota.set_deadline, timeout)
+    try:
+        future = _get_executor().submit(functools.partial(ctx.run, fn, *args, **kwargs))
+    except BaseException:
+        if slots is not None:
+            slots.release()
+        raise
+    if slots is not None:
+        # Slot background baru dilepas saat thread benar-benar selesai (juga kalau await timeout),
+        # jadi background tidak pernah memakai lebih dari SHEETS_WORKERS - 1 thread
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: _release_soon(loop, slots))
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        # Kalau belum sempat jalan di thread -> batal. Kalau sudah jalan, hasilnya dibuang.
+        future.cancel()
+        raise
+
+
+def _release_soon(loop, slots):
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        pass   # event loop sudah ditutup (shutdown)
+
+
+def shutdown(wait=True):
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+
+
+async def on_shutdown(application):
+    # Dipasang via ApplicationBuilder().post_shutdown(...)
+    shutdown(wait=False)
+
+
+def reset():
+    # Buang semua handle (misal setelah error auth / ganti spreadsheet)
+    global _creds, _client
+    with _lock:
+        _creds = None
+        _client = None
+        _spreadsheets.clear()
+        _worksheets.clear()
@@ -0,0 +1,117 @@
+import os
+import json
+import logging
+from telegram.error import TelegramError, BadRequest
+from dispatcher import DispatchReport
+
+# --- KONFIGURASI ---
+STATUS_BOARD_FILE = os.getenv("STATUS_BOARD_FILE", "status_board.json")
+# Seberapa sering (detik) papan status dicek terhadap jawaban form terbaru
+STATUS_BOARD_INTERVAL = float(os.getenv("STATUS_BOARD_INTERVAL", "120"))
+
+# Pesan BadRequest yang berarti papan lama memang sudah tidak bisa dipakai lagi
+PAPAN_HILANG = ("message to edit not found", "message can't be edited")
+
+logger = logging.getLogger(__name__)
+
+
+# --- PAPAN STATUS LIVE ---
+# Satu pesan ter-pin per grup per hari. Pesan hanya diedit kalau isinya
+# benar-benar berubah; rekap siang/sore juga menjadi edit ke papan ini.
+class StatusBoard:
+    def __init__(self, dispatcher, path=STATUS_BOARD_FILE, state=None):
+        self.dispatcher = dispatcher
+        self.path = path
+        # state: SharedState -> papan bisa dilanjutkan instance lain saat leader pindah
+        self.state = state
+        self.boards = {}   # str(chat_id) -> {'tanggal', 'message_id', 'isi', 'label'}
+        self._load()
+
+    def render(self, sudah, belum, tgl, label=""):
+        judul = f"📋 <b>PAPAN STATUS ONE DAY ONE NEWS</b>\n📅 {tgl}"
+        if label:
+            judul += f" — {label}"
+        teks_sudah = "\n".join(sudah) if sudah else "-"
+        teks_belum = "\n".join(belum) if belum else "🎉 Semua unit sudah submit!"
+        return (
+            f"{judul}\n\n"
+            f"<b>Sudah Submit ({len(sudah)}):</b>\n{teks_sudah}\n\n"
+            f"<b>Belum Submit ({len(belum)}):</b>\n{teks_belum}"
+        )
+
+    async def refresh(self, bot, chat_id, sudah, belum, tgl, waktu, label=None):
+        # waktu: string jam update (hanya ditulis saat isi berubah)
+        if self.state is not None:
+            # Instance lain (leader sebelumnya) mungkin sudah mengubah papan
+            self._load()
+        key = str(chat_id)
+        board = self.boards.get(key)
+        if label is None:
+            # Tanpa label baru -> pertahankan label hari ini (misal "Rekap Final")
+            label = board['label'] if board and board['tanggal'] == tgl else ""
+        isi = self.render(sudah, belum, tgl, label)
+        teks = f"{isi}\n\n<i>Diperbarui {waktu}</i>"
+
+        if board is None or board['tanggal'] != tgl:
+            await self._buat_baru(bot, chat_id, board, tgl, isi, label, teks)
+        elif board['isi'] != isi:
+            report = DispatchReport()
+            hasil = await self.dispatcher.edit_message_text(
+                bot, chat_id=chat_id, message_id=board['message_id'], text=teks, parse_mode="HTML",
+                report=report,
+            )
+            if hasil is not None or _tidak_berubah(report.last_error):
+                board.update(isi=isi, label=label)
+                self._save()
+            elif _papan_hilang(report.last_error):
+                # Papan lama terhapus/tidak bisa diedit -> buat ulang
+                await self._buat_baru(bot, chat_id, board, tgl, isi, label, teks)
+            else:
+                # Timeout/jaringan/flood control: papan lama dipertahankan, dicoba lagi tick berikutnya
+                logger.warning(f"Edit papan status {chat_id} gagal, dicoba lagi nanti: {report.last_error}")
+
+    async def _buat_baru(self, bot, chat_id, board_lama, tgl, isi, label, teks):
+        message = await self.dispatcher.send_message(bot, chat_id=chat_id, text=teks, parse_mode="HTML")
+        if message is None:
+            return
+        try:
+            if board_lama:
+                await bot.unpin_chat_message(chat_id=chat_id, message_id=board_lama['message_id'])
+            await bot.pin_chat_message(chat_id=chat_id, message_id=message.message_id, disable_notification=True)
+        except TelegramError as e:
+            # Bot belum jadi admin grup -> papan tetap jalan tanpa pin
+            logger.warning(f"Gagal pin papan status di {chat_id}: {e}")
+        self.boards[str(chat_id)] = {
+            'tanggal': tgl, 'message_id': message.message_id, 'isi': isi, 'label': label,
+        }
+        self._save()
+
+    def _save(self):
+        if self.state is not None:
+            self.state.set_setting("status_board", self.boards)
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.boards, f)
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if self.state is not None:
+            self.boards = self.state.get_setting("status_board", {})
+            return
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.boards = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"File papan status tidak bisa dibaca: {e}")
+
+
+def _papan_hilang(error):
+    return isinstance(error, BadRequest) and any(p in str(error).lower() for p in PAPAN_HILANG)
+
+
+def _tidak_berubah(error):
+    # Isi di Telegram sudah sama (misal edit sebelumnya sampai tapi balasannya timeout)
+    return isinstance(error, BadRequest) and "message is not modified" in str(error).lower()
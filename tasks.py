@@ -0,0 +1,269 @@
+import os
+import time
+import asyncio
+import logging
+from gspread.utils import rowcol_to_a1
+import sheets
+import quota
+import events
+
+# --- KONFIGURASI ---
+# Berapa detik data tab tugas boleh dipakai ulang sebelum dibaca lagi dari Sheets
+TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", "30"))
+# Interval (detik) penggabungan update status sebelum dikirim sebagai satu batch_update
+STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", "0.5"))
+STATUS_COL = 6   # Kolom F = status
+
+logger = logging.getLogger(__name__)
+
+
+# --- CACHE TAB TUGAS (READ-THROUGH) ---
+# Dengan mirror SQLite: start dingin dilayani dari salinan lokal, dan data basi
+# tetap dilayani sambil refresh dari Sheets berjalan di background.
+# Dengan change detector: refresh cek metadata file dulu, baca penuh hanya kalau berubah.
+class TaskCache:
+    def __init__(self, get_sheet, ttl=TASK_CACHE_TTL, mirror=None, changes=None):
+        self.get_sheet = get_sheet   # fungsi yang mengembalikan worksheet tugas
+        self.ttl = ttl
+        self.mirror = mirror
+        self.changes = changes
+        self._records = None
+        self._loaded_at = 0.0
+        self._overrides = {}         # task_id -> status yang belum tentu sudah tertulis di Sheets
+        self._rows = {}              # task_id -> nomor baris di Sheets (header = baris 1)
+        self._lock = asyncio.Lock()
+        self._background = None
+
+    def is_fresh(self):
+        return self._records is not None and (time.monotonic() - self._loaded_at) < self.ttl
+
+    async def get_records(self):
+        if self.is_fresh():
+            return self._records
+        if self.mirror is not None:
+            if self._records is None and self.mirror.synced_at("tasks"):
+                self._load_from_mirror()
+            if self._records is not None:
+                # Layani data lokal sekarang, perbarui dari Sheets di background
+                self._refresh_in_background()
+                return self._records
+        await self.refresh()
+        return self._records
+
+    async def refresh(self):
+        # Banyak pemanggil bersamaan -> cuma satu yang benar-benar membaca Sheets,
+        # sisanya menunggu lalu memakai hasil yang sama.
+        async with self._lock:
+            if self.is_fresh():
+                return
+            version = None
+            if self.changes is not None:
+                changed, version = await self.changes.poll("tasks")
+                if not changed and self._records is not None:
+                    # File tidak berubah -> data yang ada dianggap segar lagi
+                    self._loaded_at = time.monotonic()
+                    return
+            sh = await sheets.run(self.get_sheet)
+            records = await sheets.run(sh.get_all_records)
+            for row in records:
+                status = self._overrides.get(str(row.get('id')))
+                if status is not None:
+                    row['status'] = status
+            if self.mirror is not None:
+                self.mirror.replace_tasks(records)
+            self._records = records
+            self._loaded_at = time.monotonic()
+            self._set_rows(str(row.get('id')) for row in records)
+            if self.changes is not None:
+                self.changes.mark("tasks", version)
+            logger.info(f"Cache tugas dimuat ulang ({len(records)} baris).")
+
+    def _refresh_in_background(self):
+        if self._background is None or self._background.done():
+            self._background = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self):
+        try:
+            # Dipicu handler, tapi tidak ada user yang menunggu -> lane background
+            with quota.lane(quota.BACKGROUND):
+                await self.refresh()
+        except Exception as e:
+            logger.error(f"Refresh tab tugas gagal, tetap memakai data lokal: {e}")
+
+    def _load_from_mirror(self):
+        self._records = self.mirror.tasks()
+        for row in self._records:
+            status = self._overrides.get(str(row.get('id')))
+            if status is not None:
+                row['status'] = status
+        # Umur data dihitung dari waktu sinkronisasi terakhir mirror
+        umur = time.time() - self.mirror.synced_at("tasks")
+        self._loaded_at = time.monotonic() - umur
+        self._rows = self.mirror.task_rows()
+        logger.info(f"Cache tugas dimuat dari mirror lokal ({len(self._records)} baris).")
+
+    def _set_rows(self, ids, first_row=2):
+        self._rows = {task_id: i for i, task_id in enumerate(ids, first_row) if task_id}
+
+    def resolve_rows(self, sh, task_ids):
+        # Blocking (dipanggil dari thread pool). Index ID -> baris selalu dicek dulu
+        # sebelum menulis: satu batch_get sel A{baris} untuk semua ID. Kalau ada yang
+        # tidak cocok / belum dikenal (baris disisipkan / tab diurutkan ulang),
+        # baca ulang kolom A dan bangun ulang index.
+        task_ids = [str(t) for t in task_ids]
+        rows = {t: self._rows.get(t) for t in task_ids}
+        if task_ids and all(rows.values()):
+            cells = sh.batch_get([f"A{rows[t]}" for t in task_ids])
+            if all(_cell_value(c) == t for c, t in zip(cells, task_ids)):
+                return rows
+            logger.info("Posisi baris tab tugas berubah, index ID dibangun ulang.")
+        self._set_rows((str(v) for v in sh.col_values(1)[1:]))
+        return {t: self._rows.get(t) for t in task_ids}
+
+    async def find(self, task_id):
+        for row in await self.get_records():
+            if str(row.get('id')) == str(task_id):
+                return row
+        return None
+
+    def set_status(self, task_id, status):
+        # Dipanggil saat bot sendiri menulis ke Sheets, supaya cache tidak basi.
+        # Override tetap dipakai saat reload sampai tulisan benar-benar masuk.
+        # Hanya memori; salinan di mirror ditulis StatusWriter di thread (lihat enqueue).
+        self._overrides[str(task_id)] = status
+        if self._records is None:
+            return
+        for row in self._records:
+            if str(row.get('id')) == str(task_id):
+                row['status'] = status
+
+    def clear_override(self, task_id, status):
+        if self._overrides.get(str(task_id)) == status:
+            del self._overrides[str(task_id)]
+
+    def invalidate(self):
+        self._records = None
+
+
+def _cell_value(value_range):
+    # Hasil batch_get satu sel: [['123']] atau [] kalau kosong
+    return str(value_range[0][0]).strip() if value_range and value_range[0] else ""
+
+
+# --- WRITE-BEHIND UPDATE STATUS ---
+# Klik "Sudah Submit" langsung dibalas di Telegram; perubahan status ditampung
+# lalu dikirim sebagai SATU batch_update setiap STATUS_FLUSH_INTERVAL detik.
+# Antrean juga disimpan di outbox mirror, jadi tetap aman walau bot mati mendadak.
+class StatusWriter:
+    def __init__(self, cache, interval=STATUS_FLUSH_INTERVAL):
+        self.cache = cache
+        self.mirror = cache.mirror
+        self.interval = interval
+        self._pending = {}           # task_id -> status (klik terakhir yang menang)
+        self._origin = {}            # task_id -> update_id klik tsb (flush jalan di luar konteks handler)
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    async def enqueue(self, task_id, status):
+        self._queue(task_id, status)
+        if self.mirror is not None:
+            # Commit SQLite (fsync) di thread, event loop tetap melayani klik lain
+            await asyncio.to_thread(self.mirror.queue_task_status, task_id, status)
+        self._wakeup.set()
+
+    def _queue(self, task_id, status):
+        self._pending[str(task_id)] = status
+        self._origin[str(task_id)] = events.current("update_id")
+        self.cache.set_status(task_id, status)
+
+    async def start(self):
+        if self.mirror is not None:
+            # Update yang belum terkirim dari sesi sebelumnya (sudah ada di outbox, tidak ditulis ulang)
+            outbox = await asyncio.to_thread(self.mirror.outbox, "tasks")
+            for task_id, status in outbox.items():
+                self._queue(task_id, status)
+            if outbox:
+                self._wakeup.set()
+                logger.info(f"Memuat ulang {len(outbox)} update status tertunda dari outbox.")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, retries=3):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Flush terakhir sebelum bot mati
+        for _ in range(retries):
+            if not self._pending:
+                break
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Flush terakhir gagal: {e}")
+                await asyncio.sleep(1)
+        if self._pending:
+            logger.error(f"{len(self._pending)} update status belum terkirim, tetap tersimpan di outbox.")
+
+    async def _run(self):
+        backoff = self.interval
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.interval)   # kumpulkan klik yang berdekatan
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                backoff = self.interval
+            except Exception as e:
+                logger.error(f"Gagal flush status ({len(self._pending)} antre), dicoba lagi: {e}")
+                backoff = min(backoff * 2, 60)
+                await asyncio.sleep(backoff)
+                self._wakeup.set()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            origin, self._origin = self._origin, {}
+            try:
+                # Event "sheets" batch_update membawa semua update_id asal di batch ini
+                with events.bind(update_ids=sorted({u for u in origin.values() if u is not None})):
+                    written = await sheets.run(self._write_batch, batch, origin)
+            except Exception:
+                # Kembalikan ke antrean tanpa menimpa klik yang lebih baru
+                for task_id, status in batch.items():
+                    self._pending.setdefault(task_id, status)
+                    self._origin.setdefault(task_id, origin.get(task_id))
+                raise
+            for task_id, status in batch.items():
+                self.cache.clear_override(task_id, status)
+            if self.mirror is not None:
+                await asyncio.to_thread(self.mirror.outbox_remove_many, "tasks", list(batch.items()))
+            logger.info(f"Batch update status: {written} baris ditulis.")
+
+    def _write_batch(self, batch, origin=None):
+        origin = origin or {}
+        sh = self.cache.get_sheet()
+        # ID -> nomor baris dari index cache (tanpa sh.find per klik)
+        rows = self.cache.resolve_rows(sh, batch.keys())
+        updates, ditulis = [], []
+        for task_id, status in batch.items():
+            row = rows.get(task_id)
+            if row is None:
+                logger.warning(f"ID {task_id} tidak ditemukan di kolom A, update dilewati.")
+                events.emit("status_write", update_id=origin.get(task_id), task_id=task_id,
+                            status=status, outcome="not_found")
+                continue
+            updates.append({'range': rowcol_to_a1(row, STATUS_COL), 'values': [[status]]})
+            ditulis.append((task_id, status, row))
+        if updates:
+            sh.batch_update(updates)
+        # Satu event per klik, dengan update_id handler yang mengantrekannya
+        for task_id, status, row in ditulis:
+            events.emit("status_write", update_id=origin.get(task_id), task_id=task_id,
+                        status=status, row=row, outcome="ok")
+        return len(updates)
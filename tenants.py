@@ -0,0 +1,140 @@
+import os
+import json
+import datetime
+import logging
+import pytz
+import sheets
+from mirror import MIRROR_DB
+from cluster import get_shared_state
+
+# --- KONFIGURASI ---
+# Satu proses bisa melayani banyak grup (tenant). Isi TENANTS_FILE contohnya:
+# [
+#   {"key": "sulsel", "chat_id": -1001234567890, "spreadsheet_id": "1AbC...",
+#    "timezone": "Asia/Makassar", "hari_kerja": [0, 1, 2, 3, 4],
+#    "jadwal": {"pagi": "08:00", "siang": "13:00", "sore": "17:00", "rekap": "08:05", "arsip": "01:30"}}
+# ]
+# Kalau file tidak ada -> satu tenant dari GROUP_CHAT_ID & SPREADSHEET_ID di .env
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")
+# Jeda (detik) antar tenant supaya job terjadwal tidak menembak API di detik yang sama
+TENANT_STAGGER = float(os.getenv("TENANT_STAGGER", "7"))
+
+DEFAULT_TIMEZONE = "Asia/Makassar"
+DEFAULT_JADWAL = {"pagi": "08:00", "siang": "13:00", "sore": "17:00", "rekap": "08:05", "arsip": "01:30"}
+DEFAULT_HARI_KERJA = [0, 1, 2, 3, 4]
+
+logger = logging.getLogger(__name__)
+
+_registry = None
+
+
+# --- TENANT ---
+class Tenant:
+    def __init__(self, key, chat_id, spreadsheet_id, timezone=DEFAULT_TIMEZONE,
+                 jadwal=None, hari_kerja=None, mirror_db=None, settings=None):
+        self.key = str(key)
+        self.chat_id = int(chat_id)
+        self.spreadsheet_id = spreadsheet_id
+        self.tz = pytz.timezone(timezone)
+        self.jadwal = dict(DEFAULT_JADWAL, **(jadwal or {}))
+        self._hari_kerja = list(DEFAULT_HARI_KERJA if hari_kerja is None else hari_kerja)
+        self.mirror_db = mirror_db or f"mirror-{self.key}.db"
+        # State bersama antar instance (SharedState); None -> hanya di memori proses ini
+        self.settings = settings
+
+    @property
+    def hari_kerja(self):
+        # Diubah lewat /sethari di instance mana pun -> berlaku di semua instance
+        if self.settings is None:
+            return self._hari_kerja
+        return self.settings.get_setting(f"hari_kerja:{self.key}", self._hari_kerja)
+
+    @hari_kerja.setter
+    def hari_kerja(self, value):
+        self._hari_kerja = list(value)
+        if self.settings is not None:
+            self.settings.set_setting(f"hari_kerja:{self.key}", self._hari_kerja)
+
+    def open_spreadsheet(self):
+        return sheets.open_spreadsheet(key=self.spreadsheet_id)
+
+    def get_sheet(self, nama_tab):
+        return sheets.get_worksheet(nama_tab, key=self.spreadsheet_id)
+
+    def now(self):
+        return datetime.datetime.now(self.tz)
+
+    def is_hari_kerja(self):
+        return self.now().weekday() in self.hari_kerja
+
+    def waktu(self, nama, jeda=0):
+        # "08:00" + jeda detik -> datetime.time ber-timezone untuk job_queue.run_daily.
+        # Dilokalkan lewat tz.localize (tzinfo pytz mentah memberi offset LMT).
+        jam, menit = (int(x) for x in self.jadwal[nama].split(":"))
+        dasar = datetime.datetime.combine(self.now().date(), datetime.time(jam, menit))
+        return self.tz.localize(dasar + datetime.timedelta(seconds=jeda)).timetz()
+
+
+# --- REGISTRY ---
+class TenantRegistry:
+    def __init__(self, tenants):
+        if not tenants:
+            raise RuntimeError("Belum ada tenant: isi TENANTS_FILE atau GROUP_CHAT_ID di .env")
+        self.tenants = list(tenants)
+        self.by_key = {t.key: t for t in self.tenants}
+        self.by_chat = {t.chat_id: t for t in self.tenants}
+
+    def __iter__(self):
+        return iter(self.tenants)
+
+    def __len__(self):
+        return len(self.tenants)
+
+    @property
+    def default(self):
+        return self.tenants[0]
+
+    def get(self, key):
+        return self.by_key.get(str(key))
+
+    def for_chat(self, chat_id):
+        return self.by_chat.get(chat_id)
+
+    def for_context(self, update, context):
+        # Di grup -> tenant grup itu. Di DM -> tenant terakhir yang dipakai user
+        # (diingat lewat remember()), selain itu tenant pertama.
+        chat = update.effective_chat
+        if chat is not None and chat.type != "private":
+            tenant = self.for_chat(chat.id)
+            if tenant is not None:
+                return tenant
+        return self.get(context.user_data.get('tenant')) or self.default
+
+    def remember(self, context, tenant):
+        context.user_data['tenant'] = tenant.key
+
+
+def load_tenants(path=TENANTS_FILE, settings=None):
+    if os.path.exists(path):
+        with open(path) as f:
+            tenants = [Tenant(settings=settings, **item) for item in json.load(f)]
+        logger.info(f"{len(tenants)} tenant dimuat dari {path}.")
+        return TenantRegistry(tenants)
+
+    try:
+        chat_id = int(os.getenv("GROUP_CHAT_ID"))
+    except (TypeError, ValueError):
+        print("❌ ERROR: GROUP_CHAT_ID di .env tidak ditemukan atau bukan angka!")
+        chat_id = 0
+    return TenantRegistry([Tenant(
+        "default", chat_id, os.getenv("SPREADSHEET_ID"),
+        timezone=os.getenv("TIMEZONE", DEFAULT_TIMEZONE), mirror_db=MIRROR_DB, settings=settings,
+    )])
+
+
+def get_registry():
+    # Satu registry per proses, dipakai bersama bot & admin
+    global _registry
+    if _registry is None:
+        _registry = load_tenants(settings=get_shared_state())
+    return _registry
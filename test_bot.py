@@ -2,91 +2,124 @@ import os
 import logging
 import datetime
 import pytz
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, CallbackQueryHandler
+
+# .env dimuat sebelum import modul lokal (konfigurasinya dibaca saat import)
+load_dotenv()
+
 from admin import get_admin_handler
+import sheets
+import quota
+from tasks import TaskCache, StatusWriter
+from dispatcher import Dispatcher
+import digest
+from ledger import ReminderLedger, kirim_dengan_ledger
+import webhook
+import metrics
+import events
+from mirror import get_mirror, MIRROR_SYNC_INTERVAL
+from change_detect import ChangeDetector, DriveMetadataSource
 
 # 1. KONFIGURASI & LOGGING
-load_dotenv()
 TOKEN = os.getenv("TELEGRAM_TOKEN")
 GROUP_CHAT_ID = os.getenv("GROUP_CHAT_ID")
 SHEET_NAME = os.getenv("SPREADSHEET_NAME")
 
-# Logging (Simpan Riwayat Push Message)
-logging.basicConfig(
-    format ='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level = logging.INFO,         
-    handlers = [
-        logging.FileHandler("bot.log"), # Simpan log ke file bot.log
-        logging.StreamHandler()         # Tampilkan log di console
-    ] 
-)
+# Logging (Simpan Riwayat Push Message) ke bot.log + console, ditulis thread terpisah.
+# Event terstruktur per klik/job/panggilan API ada di events.jsonl (lihat events.py)
+events.setup_logging("bot.log")
 logger = logging.getLogger(__name__)
 
 # 2. FUNGSI KONEKSI GOOGLE SHEETS
 def connect_sheets():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"] 
-    creds = ServiceAccountCredentials.from_json_keyfile_name("service_account.json", scope)
-    client = gspread.authorize(creds)
-    return client.open(SHEET_NAME).sheet1
+    # Client & worksheet di-cache di sheets.py (tidak authorize ulang tiap panggilan)
+    return sheets.get_worksheet(title=SHEET_NAME)
+
+# Cache baris tugas: reminder & /status berbagi satu pembacaan per TTL.
+# Tiap refresh cek versi file di Drive dulu; tab dibaca penuh hanya kalau berubah.
+sheet_changes = ChangeDetector(DriveMetadataSource(lambda: connect_sheets().spreadsheet))
+task_cache = TaskCache(connect_sheets, mirror=get_mirror(), changes=sheet_changes)
+# Klik "Sudah Submit" ditampung lalu ditulis per batch (write-behind)
+status_writer = StatusWriter(task_cache)
+# Semua pesan keluar lewat dispatcher (rate limit + RetryAfter otomatis)
+dispatcher = Dispatcher()
+# Catatan reminder per tugas -> tugas yang sama tidak dikirim ulang tiap tick
+reminder_ledger = ReminderLedger()
+
+async def job_sync_mirror(context: ContextTypes.DEFAULT_TYPE):
+    # Mirror lokal tab tugas diperbarui di background, bukan saat user menunggu
+    try:
+        await task_cache.refresh()
+    except Exception as e:
+        logger.error(f"Sinkronisasi mirror gagal: {e}")
+
+async def tugas_pending():
+    records = await task_cache.get_records()
+    return [row for row in records if str(row['status']).lower() == 'pending']
+
+# 3a. PESAN REMINDER PER TUGAS
+def buat_pesan_reminder(row):
+    # Mengambil data dari Google Sheets
+    task_id = row['id']
+    penulis = row['penulis']
+    judul = row['judul']
+    deadline = row['deadline']
+
+    # Pesan reminder yang akan dikirim ke grup
+    pesan = (
+        f"📢 <b>REMINDER ARTIKEL</b>\n"
+        f"Halo {penulis}, mohon segera submit ya!\n\n"
+        f"📝 <b>Judul:</b> {judul}\n"
+        f"⏰ <b>Deadline:</b> {deadline}\n\n"
+        f"<i>Klik tombol di bawah untuk konfirmasi jika sudah submit!:</i>"
+    )
+    
+    # Menyederhanakan judul panjang untuk callback data
+    judul_pendek = (judul[:30] + '..') if len(judul) > 30 else judul
+
+    # Masukkan judul yang sudah dipendekkan ke tombol
+    callback_data = f"done_{task_id}_{judul_pendek}"
+
+    # Tombol konfirmasi sudah submit
+    keyboard = [[InlineKeyboardButton("✅ Sudah Submit", callback_data = callback_data)]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Argumen kirim pesan dengan parse_mode HTML
+    return dict(
+        chat_id = GROUP_CHAT_ID,
+        text = pesan,
+        reply_markup = reply_markup,
+        parse_mode = "HTML"
+    )
 
 # 3. MENGIRIM REMINDER KE GRUP
 async def kirim_reminder_grup(context: ContextTypes.DEFAULT_TYPE):
     logger.info("Memulai pengecekan tugas...")
 
     try:
-        sh = connect_sheets()
-        records = sh.get_all_records()
-
-        count_sent = 0
-
-        for row in records:
-            if str(row['status']).lower() == 'pending':
-                # Mengambil data dari Google Sheets
-                task_id = row['id']
-                penulis = row['penulis']
-                judul = row['judul']
-                deadline = row['deadline']
-
-                # Pesan reminder yang akan dikirim ke grup
-                pesan = (
-                    f"📢 <b>REMINDER ARTIKEL</b>\n"
-                    f"Halo {penulis}, mohon segera submit ya!\n\n"
-                    f"📝 <b>Judul:</b> {judul}\n"
-                    f"⏰ <b>Deadline:</b> {deadline}\n\n"
-                    f"<i>Klik tombol di bawah untuk konfirmasi jika sudah submit!:</i>"
-                )
-                
-                # Menyederhanakan judul panjang untuk callback data
-                judul_pendek = (judul[:30] + '..') if len(judul) > 30 else judul
-
-                # Masukkan judul yang sudah dipendekkan ke tombol
-                callback_data = f"done_{task_id}_{judul_pendek}"
-
-                # Tombol konfirmasi sudah submit
-                keyboard = [[InlineKeyboardButton("✅ Sudah Submit", callback_data = callback_data)]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-                # Mengirim pesan dengan parse_mode HTML
-                await context.bot.send_message(
-                    chat_id = GROUP_CHAT_ID,
-                    text = pesan,
-                    reply_markup = reply_markup,
-                    parse_mode = "HTML"
-                )
-                count_sent += 1
-        
-        if count_sent > 0:
-            logger.info(f"Selesai. Mengirim {count_sent} reminder.")
+        pending = await tugas_pending()
+
+        if digest.is_enabled():
+            # Mode digest: semua tugas dikemas dalam sesedikit mungkin pesan
+            antrean = [(f"digest_{i}", m) for i, m in enumerate(digest.build_messages(GROUP_CHAT_ID, pending), 1)]
         else:
+            antrean = [(row['id'], buat_pesan_reminder(row)) for row in pending]
+
+        if not antrean:
             logger.info("Tidak ada tugas pending.")
-            await context.bot.send_message(
+            # Ikut dicatat di ledger supaya tidak diulang setiap tick
+            antrean = [("semua_selesai", dict(
                 chat_id = GROUP_CHAT_ID,
                 text = "🎉 Semua artikel sudah disubmit! Tidak ada reminder yang dikirim."
-            )
+            ))]
+        
+        # Hanya tugas baru/berubah/lewat cool-down yang dikirim atau diedit
+        terkirim, diedit, dilewati, gagal = await kirim_dengan_ledger(context.bot, dispatcher, reminder_ledger, antrean)
+        if gagal:
+            logger.warning(f"{gagal} reminder gagal terkirim, dicoba lagi di jalan berikutnya.")
+        logger.info(f"Selesai. Reminder terkirim={terkirim}, gagal={gagal}, diedit={diedit}, dilewati={dilewati}.")
 
     except Exception as e:
         logger.error(f"[ERROR] Gagal mengirim reminder: {e}")
@@ -105,24 +138,28 @@ async def tombol_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             task_id_target = data.split("_")[1]
             task_title_target = "_".join(data.split("_")[2:])  # Menggabungkan semua bagian setelah ID
 
-            print(f"Tombol diklik! Mencari ID: {task_id_target}...")
+            events.emit("tombol.klik", task_id=task_id_target, user=user_klik)
 
-            sh = connect_sheets()
+            # Mencari baris dengan 'id' yang sesuai di cache tab tugas
+            task = await task_cache.find(task_id_target)
 
-            # Mecari baris pada kolom 'id' yang sesuai dengan ID tugas
-            cell = sh.find(task_id_target, in_column = 1)
-
-            if cell is None:
-                print(f"❌ Gagal: ID {task_id_target} tidak ditemukan di kolom A.")
+            if task is None:
+                events.emit("tombol.tidak_ditemukan", task_id=task_id_target)
                 await query.message.reply_text(f"⚠️ Gagal: ID {task_id_target} tidak ditemukan di Spreadsheet. Cek datanya.")
                 return
 
-            judul_asli = sh.cell(cell.row, 4).value  # Kolom 4 = Kolom D (judul)
+            judul_asli = task['judul']
+
+            # Update status menjadi "Done" lewat antrean write-behind (batch_update)
+            await status_writer.enqueue(task_id_target, "done")
 
-            # Update status di Spreadsheet menjadi "Done"
-            sh.update_cell(cell.row, 6, "done")         # Kolom 6 = Kolom F (status)
+            events.emit("tombol.antre", task_id=task_id_target, status="done")
 
-            print(f"✅ Sukses: Status Baris {cell.row} diubah menjadi 'done'")
+            # Tombol dari pesan digest: teks ringkasan dibiarkan, keyboard disegarkan
+            if digest.is_digest(query.message):
+                await digest.refresh_keyboard(query, await tugas_pending(), digest.current_page(query.message))
+                await query.message.reply_text(f"✅ <b>{judul_asli}</b> dikonfirmasi oleh @{user_klik}.", parse_mode="HTML")
+                return
 
             # Mengatur zona waktu ke WITA
             tz_wita = pytz.timezone('Asia/Makassar')
@@ -146,8 +183,16 @@ async def tombol_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await query.message.reply_text(f"✅ Sudah submit! Namun gagal update pesan di grup. Cek log untuk detail.")
         
         except Exception as e:
-            print(f"❌ Gagal memproses tombol: {e}")
-            await query.message.reply_text("⚠️ Terjadi kesalahan saat update database.")
+            logger.error(f"Gagal memproses tombol {data}: {e}")
+            events.emit("tombol.error", data=data, error=type(e).__name__)
+            if quota.is_quota_error(e):
+                await query.message.reply_text("⏳ Google Sheets sedang sibuk, coba klik lagi sebentar lagi.")
+            else:
+                await query.message.reply_text("⚠️ Terjadi kesalahan saat update database.")
+
+    # Navigasi halaman keyboard digest
+    elif data.startswith("digest_"):
+        await digest.refresh_keyboard(query, await tugas_pending(), digest.parse_page(data))
 
     # ==== MENU CALLBACK ====
     elif data == "menu_status":
@@ -165,8 +210,7 @@ async def tombol_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # 5. CEK STATUS PENDING
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    sh = connect_sheets()
-    records = sh.get_all_records()
+    records = await task_cache.get_records()
 
     data = [
         f"• {r['judul']} ({r['penulis']})"
@@ -216,8 +260,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # 7. LIST SEMUA BERITA (BERDASARKAN STATUS)
 async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    sh = connect_sheets()
-    records = sh.get_all_records()
+    records = await task_cache.get_records()
 
     list_pending = [
         f"↦ {r['judul']} | {r['penulis']}" 
@@ -285,9 +328,18 @@ async def cmd_panduan(update: Update, context: ContextTypes.DEFAULT_TYPE):
     pesan_masuk = update.message or update.callback_query.message
     await pesan_masuk.reply_text(msg, parse_mode="HTML")
 
+# HOOK START/STOP APLIKASI
+async def post_init(application):
+    await status_writer.start()
+
+async def post_shutdown(application):
+    # Pastikan update status yang masih antre terkirim sebelum bot mati
+    await status_writer.stop()
+    await sheets.on_shutdown(application)
+
 # MAIN
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(TOKEN).build()
+    app = ApplicationBuilder().token(TOKEN).request(metrics.telegram_request()).post_init(post_init).post_shutdown(post_shutdown).build()
 
     # COMMAND
     app.add_handler(get_admin_handler())
@@ -303,6 +355,7 @@ if __name__ == "__main__":
     # Pengaturan JobQueue untuk reminder
     # Simulasi
     job_queue = app.job_queue
+    job_queue.run_repeating(job_sync_mirror, interval=MIRROR_SYNC_INTERVAL, first=1)
     job_queue.run_repeating(kirim_reminder_grup, interval=60, first=10)
 
     # Real case
@@ -312,4 +365,5 @@ if __name__ == "__main__":
 
     print("Bot jalan...")
 
-    app.run_polling()
\ No newline at end of file
+    # Polling atau webhook, dipilih lewat BOT_MODE di .env
+    webhook.run(app)
\ No newline at end of file
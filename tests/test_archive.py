@@ -0,0 +1,49 @@
+import datetime
+from types import SimpleNamespace
+import pytz
+from archive import ResponseArchive
+
+TZ = pytz.timezone("Asia/Makassar")
+HARI_INI = datetime.date(2026, 10, 18)
+
+
+def arsip(retention=60, max_rows=5000):
+    tenant = SimpleNamespace(key="uji", tz=TZ, now=lambda: TZ.localize(datetime.datetime(2026, 10, 18, 9)))
+    return ResponseArchive(tenant, mirror=None, directory="/tidak-dipakai", retention=retention, max_rows=max_rows)
+
+
+def baris(tanggal, jam="08:00:00", witel="Witel A"):
+    ts = tanggal if isinstance(tanggal, str) else f"{tanggal.strftime('%d/%m/%Y')} {jam}"
+    return ["1", ts, "a@contoh.id", "PIC", "Judul", witel]
+
+
+def lama(hari):
+    return HARI_INI - datetime.timedelta(days=hari)
+
+
+def test_baris_lama_dipilih_sampai_cutoff():
+    rows = [baris(lama(90)), baris(lama(80)), baris(lama(59)), baris(HARI_INI)]
+    assert arsip(retention=60).select(rows) == 2
+
+
+def test_timestamp_tidak_terbaca_di_atas_tidak_dipilih():
+    # Format ISO tidak ada di TIMESTAMP_FORMATS -> tidak boleh dianggap lama
+    rows = [baris("2026-10-18 09:00:00") for _ in range(5)]
+    assert arsip().select(rows) == 0
+
+
+def test_baris_kosong_menghentikan_seleksi():
+    rows = [baris(lama(90)), baris(""), baris(lama(90))]
+    assert arsip().select(rows) == 1
+
+
+def test_baris_hari_ini_tidak_pernah_dipilih():
+    rows = [baris(HARI_INI), baris(HARI_INI, "10:00:00")]
+    assert arsip(retention=1).select(rows) == 0
+    rows = [baris(lama(2)), baris(lama(1)), baris(HARI_INI)]
+    assert arsip(retention=1).select(rows) == 1
+
+
+def test_batas_max_rows_dibulatkan_ke_hari():
+    rows = [baris(lama(90), f"08:0{i}:00") for i in range(3)] + [baris(lama(89))]
+    assert arsip(max_rows=2).select(rows) == 3
@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import change_detect
+import tasks
+from change_detect import ChangeDetector, FakeMetadataSource
+from fakes import FakeWorksheet
+
+
+class Jam:
+    # Pengganti modul time: monotonic() hanya maju lewat maju()
+    def __init__(self):
+        self.sekarang = 1000.0
+
+    def monotonic(self):
+        return self.sekarang
+
+    def maju(self, detik):
+        self.sekarang += detik
+
+
+async def _run_langsung(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def jam(monkeypatch):
+    jam = Jam()
+    # sheets.run tanpa thread pool / governor kuota: cukup panggil langsung
+    for modul in (change_detect, tasks):
+        monkeypatch.setattr(modul, "time", jam)
+        monkeypatch.setattr(modul, "sheets", SimpleNamespace(run=_run_langsung))
+    return jam
+
+
+def poll(detector, consumer="tasks"):
+    return asyncio.run(detector.poll(consumer))
+
+
+def test_tidak_berubah_setelah_mark(jam):
+    meta = FakeMetadataSource()
+    detector = ChangeDetector(meta, ttl=5, max_age=900)
+    changed, version = poll(detector)
+    assert changed
+    detector.mark("tasks", version)
+    assert poll(detector) == (False, version)
+
+
+def test_metadata_dipakai_bersama_selama_ttl(jam):
+    meta = FakeMetadataSource()
+    detector = ChangeDetector(meta, ttl=5, max_age=900)
+    detector.mark("tasks", poll(detector)[1])
+    meta.bump()
+    # Masih dalam satu tick: versi lama dari cache, Drive tidak ditanya lagi
+    assert poll(detector)[0] is False
+    assert meta.calls == 1
+    jam.maju(5)
+    assert poll(detector)[0] is True
+    assert meta.calls == 2
+
+
+def test_consumer_dilacak_terpisah(jam):
+    detector = ChangeDetector(FakeMetadataSource(), ttl=5, max_age=900)
+    detector.mark("tasks", poll(detector)[1])
+    assert poll(detector, "tasks")[0] is False
+    assert poll(detector, "mirror")[0] is True
+
+
+def test_max_age_memaksa_baca_penuh(jam):
+    detector = ChangeDetector(FakeMetadataSource(), ttl=5, max_age=900)
+    detector.mark("tasks", poll(detector)[1])
+    jam.maju(899)
+    assert poll(detector)[0] is False
+    jam.maju(1)
+    assert poll(detector)[0] is True
+
+
+def test_metadata_gagal_dianggap_berubah(jam):
+    class Rusak:
+        def version(self):
+            raise RuntimeError("Drive API mati")
+
+    detector = ChangeDetector(Rusak(), ttl=5, max_age=900)
+    assert poll(detector) == (True, None)
+    # Versi None tidak dicatat -> tetap dianggap berubah di poll berikutnya
+    detector.mark("tasks", None)
+    jam.maju(5)
+    assert poll(detector) == (True, None)
+
+
+def test_task_cache_lewati_baca_penuh_kalau_tidak_berubah(jam):
+    ws = FakeWorksheet("tugas", [["id", "judul", "status"], ["1", "Judul 1", "pending"]])
+    meta = FakeMetadataSource()
+    cache = tasks.TaskCache(lambda: ws, ttl=30, changes=ChangeDetector(meta, ttl=5, max_age=900))
+
+    asyncio.run(cache.get_records())
+    assert ws.calls["sheets.get_all_records"] == 1
+
+    # TTL cache habis, file tidak berubah -> hanya cek metadata
+    jam.maju(31)
+    asyncio.run(cache.get_records())
+    assert ws.calls["sheets.get_all_records"] == 1
+
+    # File berubah -> baca penuh lagi
+    ws.rows.append(["2", "Judul 2", "pending"])
+    meta.bump()
+    jam.maju(31)
+    records = asyncio.run(cache.get_records())
+    assert ws.calls["sheets.get_all_records"] == 2
+    assert [r["id"] for r in records] == [1, 2]
@@ -0,0 +1,38 @@
+import datetime
+from types import SimpleNamespace
+import pytz
+from mirror import Mirror
+from responses import SubmissionIndex
+
+TZ = pytz.timezone("Asia/Makassar")
+
+
+def baris(tanggal, witel, jam="08:00:00"):
+    return ["1", f"{tanggal.strftime('%d/%m/%Y')} {jam}", "a@contoh.id", "PIC", "Judul", witel]
+
+
+def resync(index, rows, generation):
+    # ResponseLog setelah full resync: generation berganti, rows = isi sheet sekarang
+    index.update(SimpleNamespace(generation=generation, rows=rows), rows)
+
+
+def test_resync_tanpa_baris_tidak_menghapus_riwayat(tmp_path):
+    mirror = Mirror(str(tmp_path / "mirror.db"))
+    index = SubmissionIndex(TZ, mirror=mirror)
+    resync(index, [baris(datetime.date(2026, 8, 1), "Witel A")], generation=1)
+
+    # Sheet kosong (semua sudah diarsip) -> riwayat di mirror tetap ada
+    resync(index, [], generation=2)
+    assert mirror.first_submission_date() == "2026-08-01"
+
+
+def test_resync_mempertahankan_hari_yang_sudah_diarsip(tmp_path):
+    mirror = Mirror(str(tmp_path / "mirror.db"))
+    index = SubmissionIndex(TZ, mirror=mirror)
+    resync(index, [baris(datetime.date(2026, 8, 1), "Witel A"),
+                   baris(datetime.date(2026, 10, 17), "Witel B")], generation=1)
+
+    # Baris Agustus sudah dipindah ke arsip, sheet hanya berisi Oktober
+    resync(index, [baris(datetime.date(2026, 10, 17), "Witel C")], generation=2)
+    semua = mirror.submissions_between("2026-01-01", "2026-12-31")
+    assert [(t, w) for t, w, _ in semua] == [("2026-08-01", "Witel A"), ("2026-10-17", "Witel C")]
@@ -0,0 +1,122 @@
+import os
+import hmac
+import signal
+import asyncio
+import logging
+from aiohttp import web
+from telegram import Update
+import metrics
+import quota
+
+# --- KONFIGURASI ---
+# BOT_MODE=webhook -> update diterima lewat HTTP (bisa di belakang load balancer),
+# selain itu tetap run_polling() seperti biasa.
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")            # URL publik, contoh: https://bot.contoh.id
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")    # wajib di mode webhook (port publik)
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+logger = logging.getLogger(__name__)
+
+
+# --- ENTRY POINT ---
+def run(application):
+    # Pengganti app.run_polling() di semua entry point
+    # Handler & job yang sudah terdaftar dibungkus pengukur latency (lihat metrics.py)
+    metrics.instrument(application)
+    # Job terjadwal memakai lane background governor Sheets (mengalah ke klik user)
+    quota.install(application)
+    # /metrics selalu di listener sendiri (default loopback), bukan di port webhook publik
+    if metrics.METRICS_PORT:
+        metrics.start_http_server()
+    if BOT_MODE.lower() == "webhook":
+        try:
+            asyncio.run(serve(application))
+        except KeyboardInterrupt:
+            pass
+    else:
+        application.run_polling()
+
+
+# --- SERVER HTTP ---
+def build_web_app(application, secret=None):
+    web_app = web.Application()
+    web_app['application'] = application
+    web_app['secret'] = WEBHOOK_SECRET if secret is None else secret
+    web_app.router.add_post(WEBHOOK_PATH, handle_update)
+    web_app.router.add_get("/healthz", handle_health)
+    return web_app
+
+
+async def handle_update(request):
+    secret = request.app['secret']
+    if not secret or not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+        logger.warning(f"Webhook ditolak: secret token salah dari {request.remote}")
+        return web.Response(status=403)
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+    if not isinstance(data, dict):
+        # JSON valid tapi bukan objek Update (list, angka, string, null)
+        return web.Response(status=400)
+
+    application = request.app['application']
+    # Diserahkan ke antrean Application -> diproses handler yang sudah terdaftar
+    await application.update_queue.put(Update.de_json(data, application.bot))
+    return web.Response()
+
+
+async def handle_health(request):
+    return web.Response(text="ok")
+
+
+async def serve(application):
+    # Tanpa secret siapa pun bisa mengirim update palsu ke port publik -> jangan jalan
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET belum diisi di .env (wajib untuk BOT_MODE=webhook)")
+    # Siklus hidup sama seperti run_polling(): initialize -> post_init -> start ... stop -> shutdown
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+
+    runner = web.AppRunner(build_web_app(application))
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_LISTEN, WEBHOOK_PORT).start()
+    if WEBHOOK_URL:
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    print(f"🌐 Webhook aktif di {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    # SIGTERM (docker/systemd stop) & SIGINT (Ctrl+C) -> keluar lewat finally di bawah,
+    # supaya post_stop/post_shutdown tetap jalan (flush status, lepas lease, tutup pool Sheets)
+    berhenti = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, berhenti.set)
+        except (NotImplementedError, RuntimeError):
+            pass   # Windows: hanya Ctrl+C (KeyboardInterrupt) yang tersedia
+    try:
+        await berhenti.wait()
+        logger.info("Sinyal berhenti diterima, mematikan bot...")
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.remove_signal_handler(sig)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await runner.cleanup()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)